@@ -3,3 +3,14 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+
+        from api import signals  # noqa: F401
+        from api_yamdb.db import (close_unhealthy_connections,
+                                  set_sqlite_pragmas)
+
+        request_started.connect(close_unhealthy_connections)
+        connection_created.connect(set_sqlite_pragmas)
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.cache import get_cache
+from users.cache import token_version_key, user_snapshot_key
+from users.models import User
+
+# Поля снимка: всё, что читают права доступа и /users/me/.
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name',
+                   'bio', 'role', 'is_staff', 'is_superuser', 'is_active')
+# Поля пользователя, которые RoleAccessToken несёт в себе. username сюда
+# не входит: его смена не отзывает токен, и пользователь из токена
+# дочитывает его из базы, а не сохраняет устаревшее имя.
+CLAIM_FIELDS = ('role', 'is_staff', 'is_superuser', 'token_version')
+
+
+def user_from_values(values):
+    """Собирает пользователя из словаря значений полей через from_db.
+
+    Остальные поля отложены и при обращении дочитываются из базы.
+    from_db ждёт значения в порядке полей модели.
+    """
+    names = [field.attname for field in User._meta.concrete_fields
+             if field.attname in values]
+    return User.from_db(DEFAULT_DB_ALIAS, names,
+                        [values[name] for name in names])
+
+
+class RoleAccessToken(AccessToken):
+    """Токен доступа с ролью, статусом и версией токенов пользователя.
+
+    Права проверяются по этим полям без чтения пользователя, а смена
+    роли увеличивает User.token_version и отзывает выданные токены.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без чтения пользователя из базы.
+
+    Для RoleAccessToken пользователь собирается из полей токена,
+    а из базы нужны только token_version и is_active, которые кэшируются.
+    Для токенов без роли кэшируется снимок полей SNAPSHOT_FIELDS.
+    Кэш живёт AUTH_USER_CACHE_TIMEOUT секунд и удаляется при сохранении
+    или удалении пользователя (users.signals).
+    """
+
+    def get_user(self, validated_token):
+        if 'token_version' in validated_token:
+            return self.get_token_user(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        cache = get_cache()
+        values = cache.get(user_snapshot_key(user_id))
+        if values is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                user_snapshot_key(user_id),
+                {field: getattr(user, field) for field in SNAPSHOT_FIELDS},
+                settings.AUTH_USER_CACHE_TIMEOUT
+            )
+            return user
+        if not values['is_active']:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return user_from_values(values)
+
+    def get_token_user(self, validated_token):
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        cache = get_cache()
+        state = cache.get(token_version_key(user_id))
+        if state is None:
+            state = User.objects.filter(pk=user_id).values_list(
+                'token_version', 'is_active').first()
+            if state is None:
+                raise AuthenticationFailed('User not found',
+                                           code='user_not_found')
+            cache.set(token_version_key(user_id), state,
+                      settings.AUTH_USER_CACHE_TIMEOUT)
+        token_version, is_active = state
+        if not is_active:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        if validated_token['token_version'] != token_version:
+            raise AuthenticationFailed('Token has been revoked',
+                                       code='token_revoked')
+        return user_from_values({
+            'id': user_id,
+            'is_active': True,
+            **{field: validated_token[field] for field in CLAIM_FIELDS},
+        })
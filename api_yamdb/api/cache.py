@@ -0,0 +1,174 @@
+"""Кэш ответов API с версиями пространств имён для точного сброса.
+
+Ключ ответа содержит текущую версию его пространства имён, например
+`titles`. Запись в связанные модели заменяет версию, и старые ответы
+перестают находиться в кэше, не требуя перебора ключей. Версия равна
+времени последней записи, поэтому она же служит Last-Modified.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, urlencode
+from rest_framework.response import Response
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def versions_shared():
+    """Видят ли версии пространств имён все процессы. Версии
+    в LocMemCache и DummyCache не замечают записей других процессов."""
+    return not isinstance(get_cache(), (LocMemCache, DummyCache))
+
+
+def version_key(namespace):
+    return f'api:version:{namespace}'
+
+
+def get_version(namespace):
+    """Возвращает версию пространства имён, создавая её при отсутствии."""
+    cache = get_cache()
+    key = version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time(), None)
+        version = cache.get(key)
+    return version
+
+
+def touch(*namespaces):
+    """Сбрасывает кэш пространств имён, выдавая им новые версии."""
+    now = time.time()
+    get_cache().set_many(
+        {version_key(namespace): now for namespace in namespaces}, None
+    )
+
+
+def slug_ids(model, namespace):
+    """Словарь slug -> id всех объектов модели, кэшируемый до записи
+    в пространство имён namespace."""
+    cache = get_cache()
+    key = f'api:slugs:{namespace}:{get_version(namespace)}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = dict(model.objects.values_list('slug', 'id'))
+        cache.set(key, ids, settings.API_CACHE_TIMEOUT)
+    return ids
+
+
+def request_fingerprint(request):
+    """Путь, отсортированные параметры запроса и формат ответа."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    fingerprint = (f'{request.path}?{query}'
+                   f'#{request.accepted_renderer.format}')
+    return hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+class CacheNamespaceMixin:
+    cache_namespace = None
+
+    def get_cache_namespace(self):
+        return self.cache_namespace
+
+    def get_cache_state(self):
+        """Состояние данных, от которого зависят кэшированные ответы."""
+        return str(get_version(self.get_cache_namespace()))
+
+
+class CachedListMixin(CacheNamespaceMixin):
+    """Кэширует list в пространстве имён cache_namespace."""
+
+    def cached(self, handler, request, *args, **kwargs):
+        namespace = self.get_cache_namespace()
+        state = hashlib.md5(self.get_cache_state().encode()).hexdigest()
+        key = (f'api:response:{namespace}:{state}:'
+               f'{request_fingerprint(request)}')
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedListMixin):
+    """Кэширует также retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalGetMixin(CacheNamespaceMixin):
+    """Отвечает 304 Not Modified на GET с актуальным If-None-Match
+    или If-Modified-Since, не выполняя сериализацию.
+
+    Валидаторы берутся из версии пространства имён, а если задано
+    validator_date_field, то и из числа строк и максимальной даты
+    в get_queryset() одним агрегирующим запросом. Дата и число строк
+    замечают записи в обход сигналов, например из load_csv.
+    local_validator_date_field используется так же, но только когда
+    версии живут в кэше процесса и не замечают записей других процессов.
+    То же состояние входит в ключ кэша ответов (CachedListMixin), чтобы
+    новый ETag не отдавался вместе с устаревшим телом ответа.
+    """
+    validator_date_field = None
+    local_validator_date_field = None
+    _validators = None
+
+    def get_cache_state(self):
+        return self.get_validators()[0]
+
+    def get_validators(self):
+        """Возвращает состояние для ETag и время последнего изменения.
+        Вычисляется один раз за запрос."""
+        if self._validators is None:
+            self._validators = self.compute_validators()
+        return self._validators
+
+    def compute_validators(self):
+        version = get_version(self.get_cache_namespace())
+        date_field = self.validator_date_field
+        if date_field is None and not versions_shared():
+            date_field = self.local_validator_date_field
+        if date_field is None:
+            return str(version), version
+        stats = self.get_queryset().order_by().aggregate(
+            latest=Max(date_field), total=Count('pk')
+        )
+        latest = stats['latest']
+        last_modified = max(version, latest.timestamp()) if latest else version
+        return f'{version}:{stats["total"]}:{latest}', last_modified
+
+    def conditional(self, handler, request, *args, **kwargs):
+        state, last_modified = self.get_validators()
+        etag = quote_etag(hashlib.md5(
+            f'{state}:{request_fingerprint(request)}'.encode()
+        ).hexdigest())
+        last_modified = int(last_modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,358 @@
+"""Загрузка данных из CSV-файлов каталога `static/data`."""
+import csv
+import io
+import json
+import os
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from reviews.models import Comment, Review
+from titles.models import Category, Genre, Title
+from users.models import ROLES, User
+
+
+def _integer(value):
+    return int(value)
+
+
+def _nullable_integer(value):
+    return int(value) if value else None
+
+
+def _text(value):
+    return value
+
+
+def _role(value):
+    if value not in dict(ROLES):
+        raise ValueError(f'Неизвестная роль {value!r}')
+    return value
+
+
+def _score(value):
+    score = int(value)
+    if not 1 <= score <= 10:
+        raise ValueError(f'Оценка {score} вне диапазона 1..10')
+    return score
+
+
+def _datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'Некорректная дата {value!r}')
+    return parsed
+
+
+class CsvTable:
+    """Описание CSV-файла: модель и преобразование колонок в поля."""
+
+    def __init__(self, name, filename, model, columns, defaults=None):
+        self.name = name
+        self.filename = filename
+        self.model = model
+        self.columns = columns
+        self.defaults = defaults or {}
+
+    def parse_row(self, header, row):
+        """Возвращает словарь значений полей модели для строки файла."""
+        if len(row) != len(header):
+            raise ValueError(
+                f'Ожидалось колонок: {len(header)}, получено: {len(row)}'
+            )
+        values = {
+            name: default() for name, default in self.defaults.items()
+        }
+        for column, value in zip(header, row):
+            field, convert = self.columns[column]
+            values[field] = convert(value)
+        return values
+
+    def build(self, values):
+        return self.model(**values)
+
+
+TABLES = (
+    CsvTable('users', 'users.csv', User, {
+        'id': ('id', _integer),
+        'username': ('username', _text),
+        'email': ('email', _text),
+        'role': ('role', _role),
+        'bio': ('bio', _text),
+        'first_name': ('first_name', _text),
+        'last_name': ('last_name', _text),
+    }, defaults={'password': lambda: make_password(None)}),
+    CsvTable('category', 'category.csv', Category, {
+        'id': ('id', _integer),
+        'name': ('name', _text),
+        'slug': ('slug', _text),
+    }),
+    CsvTable('genre', 'genre.csv', Genre, {
+        'id': ('id', _integer),
+        'name': ('name', _text),
+        'slug': ('slug', _text),
+    }),
+    CsvTable('titles', 'titles.csv', Title, {
+        'id': ('id', _integer),
+        'name': ('name', _text),
+        'year': ('year', _integer),
+        'category': ('category_id', _nullable_integer),
+    }),
+    CsvTable('genre_title', 'genre_title.csv', Title.genre.through, {
+        'id': ('id', _integer),
+        'title_id': ('title_id', _integer),
+        'genre_id': ('genre_id', _integer),
+    }),
+    CsvTable('review', 'review.csv', Review, {
+        'id': ('id', _integer),
+        'title_id': ('title_id', _integer),
+        'text': ('text', _text),
+        'author': ('author_id', _integer),
+        'score': ('score', _score),
+        'pub_date': ('pub_date', _datetime),
+    }),
+    CsvTable('comments', 'comments.csv', Comment, {
+        'id': ('id', _integer),
+        'review_id': ('review_id', _integer),
+        'text': ('text', _text),
+        'author': ('author_id', _integer),
+        'pub_date': ('pub_date', _datetime),
+    }),
+)
+
+
+TABLES_BY_NAME = {table.name: table for table in TABLES}
+
+
+class CsvImportError(Exception):
+    """Ошибка в данных CSV-файла."""
+
+
+@contextmanager
+def keep_auto_now_add(model):
+    """Отключает auto_now_add, чтобы сохранить даты из файла."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def check_header(table, header):
+    unknown = set(header) - set(table.columns)
+    if unknown:
+        raise CsvImportError(
+            f'{table.filename}: неизвестные колонки {sorted(unknown)}'
+        )
+
+
+def iter_batches(table, path, batch_size):
+    """Потоково читает файл и отдаёт списки значений по batch_size строк."""
+    with open(path, encoding='utf-8', newline='') as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader)
+        check_header(table, header)
+        while True:
+            rows = list(islice(reader, batch_size))
+            if not rows:
+                return
+            batch = []
+            for row in rows:
+                try:
+                    batch.append(table.parse_row(header, row))
+                except ValueError as error:
+                    raise CsvImportError(
+                        f'{table.filename}, строка {reader.line_num}: {error}'
+                    )
+            yield batch
+
+
+def write_batch(table, batch, batch_size, ignore_conflicts=False):
+    table.model.objects.bulk_create(
+        [table.build(values) for values in batch], batch_size=batch_size,
+        ignore_conflicts=ignore_conflicts
+    )
+
+
+def load_table(table, data_dir, batch_size):
+    """Загружает один файл в одной транзакции, возвращает число строк."""
+    path = os.path.join(data_dir, table.filename)
+    loaded = 0
+    with transaction.atomic(), keep_auto_now_add(table.model):
+        for batch in iter_batches(table, path, batch_size):
+            write_batch(table, batch, batch_size)
+            loaded += len(batch)
+    return loaded
+
+
+def truncate_tables(tables):
+    """Очищает таблицы и сбрасывает их счётчики первичных ключей."""
+    db_tables = [table.model._meta.db_table for table in tables]
+    sequences = [
+        sequence for sequence in connection.introspection.sequence_list()
+        if sequence['table'] in db_tables
+    ]
+    statements = connection.ops.sql_flush(
+        no_style(), db_tables, sequences, allow_cascade=True
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def reset_sequences(tables):
+    """Сдвигает счётчики первичных ключей за загруженные id."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [table.model for table in tables]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def split_chunks(path, chunk_size):
+    """Делит файл на диапазоны байт по границам записей.
+
+    Перевод строки внутри кавычек не завершает запись, поэтому граница
+    ставится только там, где число кавычек с начала файла чётное.
+    Возвращает заголовок и список пар (начало, конец).
+    """
+    chunks = []
+    with open(path, 'rb') as csv_file:
+        header_line = csv_file.readline()
+        start = position = csv_file.tell()
+        in_quotes = False
+        for line in csv_file:
+            position += len(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes and position - start >= chunk_size:
+                chunks.append((start, position))
+                start = position
+        if position > start:
+            chunks.append((start, position))
+    header = next(csv.reader([header_line.decode('utf-8')]))
+    return header, chunks
+
+
+def init_worker():
+    """Настраивает Django в процессе, запущенном через spawn."""
+    django.setup()
+
+
+def parse_chunk(table_name, path, header, start, end):
+    """Разбирает и проверяет диапазон байт файла в процессе-обработчике."""
+    table = TABLES_BY_NAME[table_name]
+    with open(path, 'rb') as csv_file:
+        csv_file.seek(start)
+        data = csv_file.read(end - start).decode('utf-8')
+    reader = csv.reader(io.StringIO(data, newline=''))
+    batch = []
+    for number, row in enumerate(reader, start=1):
+        try:
+            batch.append(table.parse_row(header, row))
+        except ValueError as error:
+            raise CsvImportError(
+                f'{table.filename}, байты {start}-{end}, '
+                f'запись {number}: {error}'
+            )
+    return batch
+
+
+class Checkpoint:
+    """Файл с числом записанных фрагментов каждой таблицы.
+
+    Фрагмент отмечается после фиксации его транзакции. Если процесс
+    прервался между фиксацией и записью отметки, первый фрагмент каждой
+    таблицы после возобновления вставляется с ignore_conflicts.
+    """
+
+    def __init__(self, path, chunk_size):
+        self.path = path
+        self.state = {'chunk_size': chunk_size, 'tables': {}}
+        self.resumed = os.path.exists(path)
+        if self.resumed:
+            with open(path, encoding='utf-8') as checkpoint_file:
+                self.state = json.load(checkpoint_file)
+            if self.state['chunk_size'] != chunk_size:
+                raise CsvImportError(
+                    f'{path}: загрузка начата с --chunk-size '
+                    f'{self.state["chunk_size"]}, удалите файл для '
+                    'загрузки с другим размером фрагмента'
+                )
+
+    def chunks_done(self, table, path):
+        """Возвращает число уже записанных фрагментов таблицы."""
+        stat = os.stat(path)
+        saved = self.state['tables'].get(table.name)
+        if saved is None:
+            return 0
+        if (saved['size'], saved['mtime']) != (stat.st_size, stat.st_mtime):
+            raise CsvImportError(
+                f'{table.filename} изменился после начала загрузки, '
+                f'удалите {self.path} для загрузки с начала'
+            )
+        return saved['chunks_done']
+
+    def mark(self, table, path, chunks_done):
+        stat = os.stat(path)
+        self.state['tables'][table.name] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'chunks_done': chunks_done,
+        }
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(self.state, checkpoint_file)
+        os.replace(temporary_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_table_parallel(table, data_dir, batch_size, chunk_size,
+                        executor, workers, checkpoint):
+    """Разбирает фрагменты файла в пуле процессов и записывает их
+    по порядку в текущем процессе, по транзакции на фрагмент.
+
+    Одновременно в работе не больше 2 * workers фрагментов, чтобы
+    разобранные строки не копились в памяти, пока запись отстаёт.
+    """
+    path = os.path.join(data_dir, table.filename)
+    header, chunks = split_chunks(path, chunk_size)
+    check_header(table, header)
+    done = checkpoint.chunks_done(table, path)
+    pending = deque()
+    remaining = iter(range(done, len(chunks)))
+    loaded = 0
+
+    def submit():
+        for index in islice(remaining, 2 * workers - len(pending)):
+            start, end = chunks[index]
+            pending.append(executor.submit(
+                parse_chunk, table.name, path, header, start, end
+            ))
+
+    submit()
+    with keep_auto_now_add(table.model):
+        while pending:
+            batch = pending.popleft().result()
+            submit()
+            with transaction.atomic():
+                write_batch(table, batch, batch_size,
+                            ignore_conflicts=checkpoint.resumed and not loaded)
+            done += 1
+            loaded += len(batch)
+            checkpoint.mark(table, path, done)
+    return loaded
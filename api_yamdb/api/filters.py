@@ -1,16 +1,55 @@
+from django.db import connections, router
 from django_filters import rest_framework as df_filters
-from titles.models import Title
+from titles.models import Category, Genre, Title
+
+from api.cache import slug_ids
+from titles.search import search_titles
 
 
 class TitleFilter(df_filters.FilterSet):
-    """Фильтр по полям произведений."""
-    category = df_filters.CharFilter(field_name='category__slug',
-                                     lookup_expr='icontains')
-    genre = df_filters.CharFilter(field_name="genre__slug",
-                                  lookup_expr='icontains')
+    """Фильтр по полям произведений.
+
+    category и genre ищут точное совпадение slug, переводя его в id
+    по кэшу, и фильтруют по внешнему ключу и таблице связей без JOIN
+    со справочником. Поиск по подстроке slug — category_contains
+    и genre_contains.
+    """
+    slug_sources = {
+        'category': (Category, 'categories'),
+        'genre': (Genre, 'genres'),
+    }
+
+    category = df_filters.CharFilter(method='filter_slug')
+    genre = df_filters.CharFilter(method='filter_slug')
+    category_contains = df_filters.CharFilter(field_name='category__slug',
+                                              lookup_expr='icontains')
+    genre_contains = df_filters.CharFilter(field_name='genre__slug',
+                                           lookup_expr='icontains')
     name = df_filters.CharFilter(field_name='name', lookup_expr='icontains')
-    year = df_filters.NumberFilter
+    year = df_filters.NumberFilter(field_name='year')
+    year_min = df_filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = df_filters.NumberFilter(field_name='year', lookup_expr='lte')
+    search = df_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('category', 'genre', 'name', 'year')
+        fields = ('category', 'genre', 'category_contains',
+                  'genre_contains', 'name', 'year', 'year_min', 'year_max',
+                  'search')
+
+    def filter_slug(self, queryset, name, value):
+        model, namespace = self.slug_sources[name]
+        object_id = slug_ids(model, namespace).get(value)
+        if object_id is None:
+            # Объект мог появиться после построения кэша.
+            object_id = model.objects.filter(slug=value).values_list(
+                'id', flat=True).first()
+        if object_id is None:
+            return queryset.none()
+        return queryset.filter(**{name: object_id})
+
+    def filter_search(self, queryset, name, value):
+        """Поиск по началам слов названия, категории и жанров."""
+        return search_titles(
+            queryset, value, connections[router.db_for_read(Title)]
+        )
@@ -0,0 +1,110 @@
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from titles.models import Title
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Измеряет пропускную способность создания отзывов '
+            'одновременными клиентами. Создаёт временных пользователей '
+            'и произведения в текущей базе и удаляет их по завершении.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients', type=int, default=8,
+            help='Число одновременных клиентов (потоков).'
+        )
+        parser.add_argument(
+            '--titles', type=int, default=50,
+            help='Число произведений, на каждое клиент пишет отзыв.'
+        )
+        parser.add_argument(
+            '--duplicates', type=float, default=0.1,
+            help='Доля запросов, повторяющих уже оставленный отзыв.'
+        )
+
+    def create_fixtures(self, prefix, clients, titles):
+        Title.objects.bulk_create(
+            Title(name=f'{prefix}-{number}', year=2000)
+            for number in range(titles)
+        )
+        User.objects.bulk_create(
+            User(username=f'{prefix}-{number}',
+                 email=f'{prefix}-{number}@yamdb.fake')
+            for number in range(clients)
+        )
+        return (
+            list(User.objects.filter(username__startswith=prefix)),
+            list(Title.objects.filter(name__startswith=prefix)
+                 .values_list('id', flat=True)),
+        )
+
+    def run_client(self, user, title_ids, duplicates, results):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            for title_id in title_ids:
+                repeats = 2 if random.random() < duplicates else 1
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    response = client.post(
+                        f'/api/v1/titles/{title_id}/reviews/',
+                        data={'text': 'Отзыв для замера', 'score': 7}
+                    )
+                    results.append((response.status_code,
+                                    time.perf_counter() - started))
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        users, title_ids = self.create_fixtures(
+            prefix, options['clients'], options['titles']
+        )
+        results = []
+        threads = [
+            threading.Thread(target=self.run_client, args=(
+                user, title_ids, options['duplicates'], results
+            ))
+            for user in users
+        ]
+        # Все клиенты приходят с одного адреса: без скоростей ограничения
+        # запросов замер показал бы бюджет writes.ip, а не запись отзывов.
+        unthrottled = override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}
+        })
+        started = time.perf_counter()
+        try:
+            with unthrottled:
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            Title.objects.filter(name__startswith=prefix).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+        statuses = Counter(status for status, _ in results)
+        latencies = sorted(latency for _, latency in results)
+        self.stdout.write(
+            f'Клиентов: {len(users)}, запросов: {len(results)} '
+            f'за {elapsed:.2f} с\n'
+            f'Создано (201): {statuses.pop(201, 0)}, '
+            f'отклонено как повторные (400): {statuses.pop(400, 0)}, '
+            f'прочие ответы: {dict(statuses)}\n'
+            f'Запросов в секунду: {len(results) / elapsed:.1f}\n'
+            f'Задержка p50: {statistics.median(latencies) * 1000:.1f} мс, '
+            f'p95: {latencies[int(len(latencies) * 0.95)] * 1000:.1f} мс'
+        )
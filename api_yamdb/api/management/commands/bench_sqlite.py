@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api_yamdb.db import sqlite_pragma_statements
+
+SCHEMA = (
+    'CREATE TABLE review (id INTEGER PRIMARY KEY, title_id INTEGER, '
+    'text TEXT, score INTEGER, pub_date REAL)',
+    'CREATE INDEX review_title_pub_date ON review (title_id, pub_date DESC)',
+)
+READ_SQL = ('SELECT id, text, score FROM review WHERE title_id = ? '
+            'ORDER BY pub_date DESC LIMIT 10')
+WRITE_SQL = ('INSERT INTO review (title_id, text, score, pub_date) '
+             'VALUES (?, ?, ?, ?)')
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite с настройками по '
+            'умолчанию и с SQLITE_PRAGMAS при одновременных чтениях '
+            'и записях. Работает с временной базой, а не с рабочей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers', type=int, default=8,
+            help='Число читающих потоков.'
+        )
+        parser.add_argument(
+            '--writers', type=int, default=2,
+            help='Число пишущих потоков.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Длительность каждого прогона в секундах.'
+        )
+        parser.add_argument(
+            '--titles', type=int, default=100,
+            help='Число произведений, между которыми делятся отзывы.'
+        )
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(path, timeout=5,
+                                     check_same_thread=False)
+        for sql in sqlite_pragma_statements(pragmas):
+            connection.execute(sql)
+        return connection
+
+    def prepare(self, path, titles):
+        connection = sqlite3.connect(path)
+        with connection:
+            for sql in SCHEMA:
+                connection.execute(sql)
+            connection.executemany(WRITE_SQL, (
+                (number % titles, 'Отзыв', 5, time.time())
+                for number in range(titles * 50)
+            ))
+        connection.close()
+
+    def run_worker(self, path, pragmas, operation, titles, deadline, counts):
+        connection = self.connect(path, pragmas)
+        done = errors = 0
+        number = 0
+        try:
+            while time.monotonic() < deadline:
+                number += 1
+                try:
+                    if operation == 'read':
+                        connection.execute(
+                            READ_SQL, (number % titles,)).fetchall()
+                    else:
+                        with connection:
+                            connection.execute(WRITE_SQL, (
+                                number % titles, 'Отзыв', 7, time.time()
+                            ))
+                    done += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+        finally:
+            connection.close()
+        counts.append((operation, done, errors))
+
+    def run(self, pragmas, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            self.prepare(path, options['titles'])
+            deadline = time.monotonic() + options['duration']
+            counts = []
+            threads = [
+                threading.Thread(target=self.run_worker, args=(
+                    path, pragmas, operation, options['titles'],
+                    deadline, counts
+                ))
+                for operation, number in (('read', options['readers']),
+                                          ('write', options['writers']))
+                for _ in range(number)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        totals = {}
+        for operation, done, errors in counts:
+            total = totals.setdefault(operation, [0, 0])
+            total[0] += done
+            total[1] += errors
+        return {
+            operation: (done / options['duration'], errors)
+            for operation, (done, errors) in totals.items()
+        }
+
+    def handle(self, *args, **options):
+        runs = (
+            ('По умолчанию (journal_mode=DELETE)', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        for title, pragmas in runs:
+            result = self.run(pragmas, options)
+            self.stdout.write(title)
+            for operation, label in (('read', 'Чтений'), ('write', 'Записей')):
+                per_second, errors = result.get(operation, (0, 0))
+                self.stdout.write(
+                    f'  {label} в секунду: {per_second:.0f}, '
+                    f'ошибок блокировки: {errors}'
+                )
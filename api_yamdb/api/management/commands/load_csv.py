@@ -0,0 +1,136 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
+
+from api.cache import touch
+from api.csv_import import (TABLES, Checkpoint, CsvImportError, init_worker,
+                            load_table, load_table_parallel, reset_sequences,
+                            truncate_tables)
+from reviews.models import Review
+from titles import search
+from titles.models import Category, Genre, Title
+
+
+class Command(BaseCommand):
+    help = ('Загружает CSV-файлы из static/data в базу данных '
+            'пакетами через bulk_create, по транзакции на файл. '
+            'С --parallel файлы делятся на фрагменты, которые разбирают '
+            'процессы-обработчики, а загрузку можно возобновить.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables', nargs='*', metavar='table',
+            help='Таблицы для загрузки: '
+                 + ', '.join(table.name for table in TABLES)
+                 + '. По умолчанию загружаются все.'
+        )
+        parser.add_argument(
+            '--data-dir', default=settings.CSV_FILES_DIR,
+            help='Каталог с CSV-файлами.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Число строк в одном INSERT.'
+        )
+        parser.add_argument(
+            '--truncate', action='store_true',
+            help='Очистить таблицы перед загрузкой.'
+        )
+        parser.add_argument(
+            '--parallel', action='store_true',
+            help='Разбирать фрагменты файлов в пуле процессов '
+                 'и сохранять контрольные точки.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов-обработчиков для --parallel.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=8 * 1024 * 1024,
+            help='Размер фрагмента файла в байтах для --parallel.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR,
+                                 'load_csv.checkpoint.json'),
+            help='Файл контрольной точки для --parallel. Если он есть, '
+                 'загрузка продолжается с места остановки; --truncate '
+                 'удаляет его и начинает загрузку заново.'
+        )
+
+    def get_tables(self, names):
+        known = {table.name for table in TABLES}
+        unknown = set(names) - known
+        if unknown:
+            raise CommandError(
+                f'Неизвестные таблицы: {", ".join(sorted(unknown))}'
+            )
+        return [table for table in TABLES
+                if not names or table.name in names]
+
+    def load(self, tables, truncate, load_one):
+        if truncate:
+            truncate_tables(tables[::-1])
+        for table in tables:
+            started = time.monotonic()
+            try:
+                loaded = load_one(table)
+            except (CsvImportError, OSError) as error:
+                raise CommandError(error)
+            except IntegrityError as error:
+                raise CommandError(
+                    f'{table.filename}: {error}. '
+                    'Используйте --truncate для повторной загрузки.'
+                )
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f'{table.filename}: загружено строк {loaded} за '
+                f'{elapsed:.2f} с ({loaded / elapsed:.0f} строк/с)'
+            )
+
+    def load_parallel(self, tables, options):
+        if options['truncate'] and os.path.exists(options['checkpoint']):
+            # Загрузка с начала: прежняя контрольная точка не нужна.
+            os.remove(options['checkpoint'])
+        try:
+            checkpoint = Checkpoint(options['checkpoint'],
+                                    options['chunk_size'])
+        except (CsvImportError, ValueError) as error:
+            raise CommandError(error)
+        if checkpoint.resumed:
+            self.stdout.write(
+                f'Загрузка продолжается с контрольной точки {checkpoint.path}'
+            )
+        workers = options['workers']
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_worker) as executor:
+            self.load(
+                tables,
+                options['truncate'],
+                lambda table: load_table_parallel(
+                    table, options['data_dir'], options['batch_size'],
+                    options['chunk_size'], executor, workers, checkpoint
+                )
+            )
+        checkpoint.remove()
+
+    def handle(self, *args, **options):
+        tables = self.get_tables(options['tables'])
+        if options['parallel']:
+            self.load_parallel(tables, options)
+        else:
+            self.load(tables, options['truncate'], lambda table: load_table(
+                table, options['data_dir'], options['batch_size']
+            ))
+        reset_sequences(tables)
+        if any(table.model in (Title, Review) for table in tables):
+            Title.objects.recalculate_rating()
+        if any(table.model in (Title, Title.genre.through, Category, Genre)
+               for table in tables):
+            search.rebuild(connection)
+        touch('categories', 'genres', 'titles')
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
@@ -1,16 +1,168 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, InvalidPage, Page
+from django.core.paginator import Paginator as DjangoPaginator
+from django.core.paginator import PageNotAnInteger
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
+from api.cache import get_cache, get_version
 from api_yamdb.settings import PAGINATOR_PAGE_ITEMS_COUNT
 
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_NONE = 'none'
+COUNT_MODES = (COUNT_EXACT, COUNT_CACHED, COUNT_NONE)
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """Берёт число строк из кэша, где оно лежит до следующей записи
+    в пространство имён вьюсета."""
+
+    def __init__(self, object_list, per_page, count_cache_key=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_cache_key = count_cache_key
+
+    @cached_property
+    def count(self):
+        cache = get_cache()
+        count = cache.get(self.count_cache_key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(self.count_cache_key, count,
+                      settings.API_CACHE_TIMEOUT)
+        return count
+
+
+class UncountedPage(Page):
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class UncountedPaginator(DjangoPaginator):
+    """Страницы без COUNT(*): о следующей странице говорит лишняя
+    строка, выбранная сверх page_size."""
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('На этой странице нет результатов')
+        return UncountedPage(objects[:self.per_page], number, self,
+                             has_next=len(objects) > self.per_page)
+
 
 class Pagination(PageNumberPagination):
+    """Пагинация по номеру страницы.
+
+    Параметр ?count= или атрибут pagination_count вьюсета выбирает,
+    как считать `count`: exact — COUNT(*) на каждый запрос, cached —
+    COUNT(*) из кэша, сбрасываемого записью в пространство имён
+    вьюсета, none — без подсчёта, `count` равен null.
+    """
     page_size = PAGINATOR_PAGE_ITEMS_COUNT
+    count_query_param = 'count'
+
+    def get_count_mode(self, request, view):
+        default = getattr(view, 'pagination_count', COUNT_EXACT)
+        mode = request.query_params.get(self.count_query_param, default)
+        if mode not in COUNT_MODES:
+            return default
+        if mode == COUNT_CACHED and not hasattr(view, 'get_cache_namespace'):
+            return COUNT_EXACT
+        return mode
+
+    def get_count_cache_key(self, queryset, view):
+        namespace = view.get_cache_namespace()
+        query = hashlib.md5(str(queryset.query).encode()).hexdigest()
+        return f'api:count:{namespace}:{get_version(namespace)}:{query}'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request, view)
+        if self.count_mode == COUNT_CACHED:
+            self.django_paginator_class = partial(
+                CachedCountPaginator,
+                count_cache_key=self.get_count_cache_key(queryset, view)
+            )
+        if self.count_mode != COUNT_NONE:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = UncountedPaginator(queryset, page_size)
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        self.request = request
+        return list(self.page)
 
     def get_paginated_response(self, data):
         return Response({
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
-            'count': self.page.paginator.count,
+            'count': (None if self.count_mode == COUNT_NONE
+                      else self.page.paginator.count),
             'results': data
         })
+
+
+class CursorFeedPagination(CursorPagination):
+    """Курсорная пагинация лент по индексированному pub_date.
+
+    Следующая страница ищется условием pub_date < курсор вместо OFFSET,
+    а COUNT(*) не выполняется вовсе.
+    """
+    page_size = PAGINATOR_PAGE_ITEMS_COUNT
+    ordering = '-pub_date'
+
+
+class FeedPaginationMixin:
+    """Выбирает пагинацию по номеру страницы или по курсору.
+
+    Курсор включается параметром ?pagination=cursor, наличием ?cursor=
+    в ссылках курсорной пагинации или pagination_mode = 'cursor'
+    во вьюсете.
+    """
+    pagination_class = Pagination
+    cursor_pagination_class = CursorFeedPagination
+    pagination_mode = 'page'
+    pagination_mode_param = 'pagination'
+
+    def get_pagination_class(self):
+        params = self.request.query_params
+        mode = params.get(self.pagination_mode_param, self.pagination_mode)
+        if (mode == 'cursor'
+                or self.cursor_pagination_class.cursor_query_param in params):
+            return self.cursor_pagination_class
+        return self.pagination_class
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            self._paginator = self.get_pagination_class()()
+        return self._paginator
@@ -1,13 +1,15 @@
-from django.db.models import Avg
-from rest_framework import exceptions, serializers
+from django.db.models import Q
+from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 from rest_framework.validators import UniqueValidator
 from reviews.models import Comment, Review
 from titles.models import Category, Genre, Title
 from users.models import User
 
-from api_yamdb.settings import (message_for_reservad_name,
-                                message_for_user_not_found, reserved_name)
+from api_yamdb.settings import message_for_reservad_name, reserved_name
+
+USERNAME_TAKEN_MESSAGE = 'Пользователь с таким username уже существует'
+EMAIL_TAKEN_MESSAGE = 'Пользователь с таким email уже существует'
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -25,20 +27,12 @@ class GenreSerializer(serializers.ModelSerializer):
 class TitleSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
-    rating = serializers.SerializerMethodField()
 
     class Meta:
         model = Title
         fields = ('id', 'name', 'year', 'description',
                   'genre', 'category', 'rating')
-        read_only_fields = ('id',)
-
-    def get_rating(self, obj):
-        try:
-            rating = obj.reviews.aggregate(Avg('score'))
-            return rating.get('score__avg')
-        except TypeError:
-            return None
+        read_only_fields = ('id', 'rating')
 
 
 class TitleCreateSerializer(serializers.ModelSerializer):
@@ -55,25 +49,50 @@ class TitleCreateSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'name', 'year', 'description',
                   'genre', 'category', 'rating')
+        read_only_fields = ('rating',)
         model = Title
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """Сериализатор для пользователей со статусом user.
-    Зарезервированное имя использовать нельзя"""
+class SignUpSerializer(serializers.Serializer):
+    """Сериализатор регистрации.
+    Зарезервированное имя использовать нельзя. Уникальность username
+    и email проверяется одним запросом при сохранении, а не отдельными
+    валидаторами полей."""
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField(max_length=254)
 
-    class Meta:
-        model = User
-        fields = ('id', 'username', 'email', 'first_name',
-                  'last_name', 'bio', 'role')
-        read_only_fields = ('role', )
+    def validate_username(self, value):
+        if value == reserved_name:
+            raise serializers.ValidationError(message_for_reservad_name)
+        return value
 
-    def validate_username(self, username):
-        if username in 'me':
-            raise serializers.ValidationError(
-                'Использовать имя me запрещено'
-            )
-        return username
+    def find_user(self, username, email):
+        """Пользователь с теми же username и email или None.
+        Если занято только одно из полей, регистрация отклоняется."""
+        users = User.objects.only(
+            'id', 'username', 'email', 'password', 'last_login'
+        ).filter(Q(username=username) | Q(email=email))[:2]
+        errors = {}
+        for user in users:
+            if user.username == username and user.email == email:
+                return user
+            if user.username == username:
+                errors['username'] = [USERNAME_TAKEN_MESSAGE]
+            if user.email == email:
+                errors['email'] = [EMAIL_TAKEN_MESSAGE]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return None
+
+    def create(self, validated_data):
+        """Создаёт пользователя или возвращает уже зарегистрированного
+        с теми же данными, чтобы повторно отправить ему код."""
+        user = self.find_user(
+            validated_data['username'], validated_data['email']
+        )
+        if user is None:
+            user = User.objects.create(**validated_data)
+        return user
 
 
 class MyUserSerializer(serializers.ModelSerializer):
@@ -112,8 +131,6 @@ class TokenSerializer(serializers.Serializer):
     def validate_username(self, value):
         if value == reserved_name:
             raise serializers.ValidationError(message_for_reservad_name)
-        if not User.objects.filter(username=value).exists():
-            raise exceptions.NotFound(message_for_user_not_found)
         return value
 
 
@@ -134,15 +151,3 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = (
             'id', 'text', 'author', 'score', 'pub_date')
-
-    def validate(self, data):
-        """Запрещает пользователям оставлять повторные отзывы."""
-        if not self.context.get('request').method == 'POST':
-            return data
-        author = self.context.get('request').user
-        title_id = self.context.get('view').kwargs.get('title_id')
-        if Review.objects.filter(author=author, title=title_id).exists():
-            raise serializers.ValidationError(
-                'Вы уже оставляли отзыв на это произведение'
-            )
-        return data
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import touch
+from reviews.models import Comment, Review
+from titles.models import Category, Genre, Title
+
+
+def touch_on_commit(*namespaces):
+    transaction.on_commit(lambda: touch(*namespaces))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def reset_category_cache(sender, **kwargs):
+    touch_on_commit('categories', 'titles')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def reset_genre_cache(sender, **kwargs):
+    touch_on_commit('genres', 'titles')
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(m2m_changed, sender=Title.genre.through)
+def reset_title_cache(sender, **kwargs):
+    touch_on_commit('titles')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def reset_review_cache(sender, instance, **kwargs):
+    touch_on_commit('titles', f'reviews:{instance.title_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def reset_comment_cache(sender, instance, **kwargs):
+    touch_on_commit(f'comments:{instance.review_id}')
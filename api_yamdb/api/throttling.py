@@ -0,0 +1,115 @@
+"""Ограничение частоты запросов по алгоритму token bucket.
+
+Бюджет задаётся областью (scope) представления: throttle_scope или
+отдельно throttle_read_scope и throttle_write_scope для безопасных
+и изменяющих запросов. Для каждой области в DEFAULT_THROTTLE_RATES
+можно задать скорости `<scope>.ip`, `<scope>.user` и `<scope>.endpoint`:
+на адрес клиента, на пользователя и на всё представление. Скорость
+'N/период' означает корзину ёмкостью N, которая заполняется N жетонами
+за период. Отсутствующая скорость не ограничивает.
+
+Состояние корзины — один счётчик в кэше API, который меняется только
+атомарным incr (атомарен в Redis, Memcached и LocMemCache). Счётчик
+хранит число израсходованных жетонов в единицах, общих для всех
+корзин: за время t в корзину поступило t * N / период жетонов, так что
+время начала корзины хранить не нужно.
+"""
+import time
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from api.cache import get_cache
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 60)."""
+    number, period = rate.split('/')
+    return int(number), PERIODS[period[0]]
+
+
+def get_scope(request, view):
+    if request.method in SAFE_METHODS:
+        scope = getattr(view, 'throttle_read_scope', None)
+    else:
+        scope = getattr(view, 'throttle_write_scope', None)
+    return scope or getattr(view, 'throttle_scope', None)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Корзина жетонов на клиента в области представления."""
+    dimension = None
+
+    def get_cache_ident(self, request, view):
+        """Ключ клиента в корзине или None, если ограничение не
+        применяется."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        scope = get_scope(request, view)
+        if scope is None:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(
+            f'{scope}.{self.dimension}'
+        )
+        ident = self.get_cache_ident(request, view)
+        if rate is None or ident is None:
+            return True
+        capacity, period = parse_rate(rate)
+        key = f'throttle:{scope}.{self.dimension}:{ident}'
+        return self.take(key, capacity, period)
+
+    def take(self, key, capacity, period):
+        cache = get_cache()
+        refilled = int(time.time() * capacity / period)
+        # Новая корзина полна: израсходовано столько, сколько поступило.
+        cache.add(key, refilled, period)
+        try:
+            spent = cache.incr(key)
+        except ValueError:
+            # Ключ истёк между add и incr.
+            cache.add(key, refilled + 1, period)
+            spent = refilled + 1
+        if spent > refilled + capacity:
+            cache.decr(key)
+            deficit = spent - refilled - capacity
+            self.retry_after = deficit * period / capacity
+            return False
+        if spent <= refilled:
+            # Клиент простаивал: жетоны сверх ёмкости не копятся.
+            cache.incr(key, refilled + 1 - spent)
+        cache.touch(key, period)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Корзина на адрес клиента."""
+    dimension = 'ip'
+
+    def get_cache_ident(self, request, view):
+        return self.get_ident(request)
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Корзина на пользователя; анонимов не ограничивает."""
+    dimension = 'user'
+
+    def get_cache_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class EndpointThrottle(TokenBucketThrottle):
+    """Общая корзина всех клиентов представления."""
+    dimension = 'endpoint'
+
+    def get_cache_ident(self, request, view):
+        return type(view).__name__
@@ -1,79 +1,152 @@
+import hashlib
+
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework import filters, response, status, viewsets
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
+from rest_framework.settings import api_settings
 
+from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 
+from api.authentication import (CLAIM_FIELDS, RoleAccessToken,
+                                user_from_values)
+from api.cache import (CachedListMixin, CachedRetrieveMixin,
+                       ConditionalGetMixin, get_cache)
 from api.filters import TitleFilter
-from api.pagination import Pagination
+from api.pagination import FeedPaginationMixin, Pagination
 from api.permissions import (IsAdmin, IsAdminOrReadOnly,
                              IsAuthorOrAdministratorOrReadOnly)
 from api.serializers import (CategorySerializer, CommentSerializer,
                              GenreSerializer, MyUserSerializer,
-                             UserSerializer,
-                             ReviewSerializer, TitleCreateSerializer,
-                             TitleSerializer, TokenSerializer)
-from api_yamdb.settings import DEFAULT_FROM_EMAIL
-from reviews.models import Review
+                             ReviewSerializer, SignUpSerializer,
+                             TitleCreateSerializer, TitleSerializer,
+                             TokenSerializer)
+from api_yamdb.settings import (DEFAULT_FROM_EMAIL,
+                                message_for_duplicate_review,
+                                message_for_user_not_found)
+from reviews.models import Comment, Review
 from titles.models import Category, Genre, Title
+from users.cache import confirmed_code_key
 from users.models import User
+from users.outbox import enqueue_email
+
+
+class ParentMixin:
+    """Родительский объект вложенного маршрута.
+
+    Дочерние строки фильтруются по id из URL без загрузки родителя.
+    Родитель проверяется не больше одного раза за запрос: при создании
+    объекта и когда страница списка пуста, чтобы отличить пустой список
+    от несуществующего родителя.
+    """
+    parent_queryset = None
+    parent_lookups = {}
+    child_lookups = {}
+
+    def get_parent(self):
+        """Возвращает родительский объект или 404."""
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(self.parent_queryset, **{
+                field: self.kwargs.get(kwarg)
+                for field, kwarg in self.parent_lookups.items()
+            })
+        return self._parent
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{
+            field: self.kwargs.get(kwarg)
+            for field, kwarg in self.child_lookups.items()
+        })
 
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.get_parent()
+        return page
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(ConditionalGetMixin, FeedPaginationMixin, ParentMixin,
+                     viewsets.ModelViewSet):
     """Вьюсет для обьектов модели Comment."""
 
     serializer_class = CommentSerializer
     permission_classes = (IsAuthorOrAdministratorOrReadOnly,)
+    throttle_read_scope = 'reads'
+    throttle_write_scope = 'writes'
+    validator_date_field = 'modified'
+    # modified загружается, чтобы save() отложенного объекта его обновил.
+    queryset = Comment.objects.select_related('author').only(
+        'id', 'text', 'pub_date', 'modified', 'review', 'author__username'
+    )
+    parent_queryset = Review.objects.only('id', 'title_id')
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
+    child_lookups = {'review_id': 'review_id',
+                     'review__title_id': 'title_id'}
 
-    def get_review(self):
-        """Возвращает объект текущего отзыва."""
-        review_id = self.kwargs.get('review_id')
-        return get_object_or_404(Review, pk=review_id)
-
-    def get_queryset(self):
-        """Возвращает queryset c комментариями для текущего отзыва."""
-        return self.get_review().comments.all()
+    def get_cache_namespace(self):
+        return f'comments:{self.kwargs.get("review_id")}'
 
     def perform_create(self, serializer):
         """Создает комментарий для текущего отзыва,
         где автором является текущий пользователь."""
         serializer.save(
             author=self.request.user,
-            review=self.get_review()
+            review=self.get_parent()
         )
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, FeedPaginationMixin, ParentMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет для обьектов модели Review."""
 
     serializer_class = ReviewSerializer
     permission_classes = (IsAuthorOrAdministratorOrReadOnly,)
+    throttle_read_scope = 'reads'
+    throttle_write_scope = 'writes'
+    validator_date_field = 'modified'
+    queryset = Review.objects.select_related('author').only(
+        'id', 'text', 'score', 'pub_date', 'modified', 'title',
+        'author__username'
+    )
+    parent_queryset = Title.objects.only('id')
+    parent_lookups = {'pk': 'title_id'}
+    child_lookups = {'title_id': 'title_id'}
 
-    def get_title(self):
-        """Возвращает объект текущего произведения."""
-        title_id = self.kwargs.get('title_id')
-        return get_object_or_404(Title, pk=title_id)
-
-    def get_queryset(self):
-        """Возвращает queryset c отзывами для текущего произведения."""
-        return self.get_title().reviews.all()
+    def get_cache_namespace(self):
+        return f'reviews:{self.kwargs.get("title_id")}'
 
     def perform_create(self, serializer):
         """Создает отзыв для текущего произведения,
-        где автором является текущий пользователь."""
-        serializer.save(
-            author=self.request.user,
-            title=self.get_title()
-        )
+        где автором является текущий пользователь.
+
+        Повторный отзыв отсекает ограничение `unique review`: вставка
+        без предварительной проверки не тратит лишний запрос и не
+        пропускает одновременные запросы одного автора. Другие ошибки
+        целостности, например произведение, удалённое одновременно
+        с вставкой, не выдаются за повторный отзыв."""
+        title = self.get_parent()
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user, title=title)
+        except IntegrityError:
+            # Сообщение об ошибке зависит от базы, поэтому нарушение
+            # ограничения проверяется запросом только после неудачи.
+            if not Review.objects.filter(
+                    title=title, author=self.request.user).exists():
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY:
+                    [message_for_duplicate_review]
+            })
 
 
 class CustomMixin(ListModelMixin, CreateModelMixin, DestroyModelMixin,
@@ -81,10 +154,13 @@ class CustomMixin(ListModelMixin, CreateModelMixin, DestroyModelMixin,
     pass
 
 
-class CategoryViewSet(CustomMixin):
+class CategoryViewSet(CachedListMixin, CustomMixin):
     """API для работы с моделью категорий."""
+    cache_namespace = 'categories'
     pagination_class = Pagination
     permission_classes = (IsAdminOrReadOnly,)
+    throttle_read_scope = 'reads'
+    throttle_write_scope = 'writes'
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
     filter_backends = (filters.SearchFilter,)
@@ -92,10 +168,13 @@ class CategoryViewSet(CustomMixin):
     lookup_field = 'slug'
 
 
-class GenreViewSet(CustomMixin):
+class GenreViewSet(CachedListMixin, CustomMixin):
     """API для работы с моделью жанров."""
+    cache_namespace = 'genres'
     pagination_class = Pagination
     permission_classes = (IsAdminOrReadOnly,)
+    throttle_read_scope = 'reads'
+    throttle_write_scope = 'writes'
     serializer_class = GenreSerializer
     queryset = Genre.objects.all()
     filter_backends = (filters.SearchFilter,)
@@ -103,12 +182,19 @@ class GenreViewSet(CustomMixin):
     lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, CachedRetrieveMixin,
+                   viewsets.ModelViewSet):
     """API для работы с моделью произведений."""
+    cache_namespace = 'titles'
+    local_validator_date_field = 'modified'
     pagination_class = Pagination
     permission_classes = (IsAdminOrReadOnly,)
+    throttle_read_scope = 'reads'
+    throttle_write_scope = 'writes'
     serializer_class = TitleSerializer
-    queryset = Title.objects.all()
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     ordering_fields = ('name',)
@@ -120,51 +206,84 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleSerializer
 
 
-def create_confirmation_code_and_send_email(username):
+def create_confirmation_code_and_send_email(user):
     """Создаем confirmation code и отправляем по email"""
-    user = get_object_or_404(User, username=username)
     confirmation_code = default_token_generator.make_token(user)
-    send_mail(
+    enqueue_email(
         subject='Confirmation code',
-        message=f'Your confirmation code {confirmation_code}',
+        body=f'Your confirmation code {confirmation_code}',
+        to=user.email,
         from_email=DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        fail_silently=False
     )
 
 
+def get_confirmed_user(username, confirmation_code):
+    """Возвращает пользователя с верным кодом подтверждения или None.
+
+    Пользователь читается одним запросом по уникальному username и только
+    с полями кода и токена. Проверенный код кэшируется вместе с полями
+    токена, и повторный обмен того же кода не обращается к базе.
+    """
+    cache = get_cache()
+    key = confirmed_code_key(username)
+    code_digest = hashlib.sha256(confirmation_code.encode()).hexdigest()
+    cached = cache.get(key)
+    if cached is not None and cached[0] == code_digest:
+        return user_from_values(cached[1])
+    user = User.objects.only(
+        'id', 'password', 'last_login', *CLAIM_FIELDS
+    ).filter(username=username).first()
+    if user is None:
+        raise NotFound(message_for_user_not_found)
+    if not default_token_generator.check_token(user, confirmation_code):
+        return None
+    cache.set(key, (code_digest, {
+        field: getattr(user, field) for field in ('id', *CLAIM_FIELDS)
+    }), settings.CONFIRMATION_CODE_CACHE_TIMEOUT)
+    return user
+
+
 class APISignUp(APIView):
     """Регистрация пользователя"""
     permission_classes = (AllowAny, )
+    throttle_scope = 'auth'
 
     def post(self, request):
-        serializer = UserSerializer(data=request.data)
+        serializer = SignUpSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        create_confirmation_code_and_send_email(
-            serializer.data['username'])
+        try:
+            self.register(serializer)
+        except IntegrityError:
+            # Пользователя создал параллельный запрос после поиска:
+            # повторный поиск найдёт его или вернёт ошибку поля.
+            self.register(serializer)
         return Response({
             'email': serializer.data['email'],
             'username': serializer.data['username']},
             status=status.HTTP_200_OK)
 
+    def register(self, serializer):
+        """Поиск или создание пользователя и письмо с кодом в одной
+        транзакции."""
+        with transaction.atomic():
+            user = serializer.save()
+            create_confirmation_code_and_send_email(user)
+
 
 class APIToken(APIView):
     """Выдача токена"""
     permission_classes = (AllowAny, )
+    throttle_scope = 'auth'
 
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = get_object_or_404(
-            User,
-            username=serializer.validated_data["username"]
+        user = get_confirmed_user(
+            serializer.validated_data["username"],
+            serializer.validated_data["confirmation_code"]
         )
-
-        if default_token_generator.check_token(
-            user, serializer.validated_data["confirmation_code"]
-        ):
-            token = AccessToken.for_user(user)
+        if user is not None:
+            token = RoleAccessToken.for_user(user)
             return Response({"token": str(token)}, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -175,13 +294,12 @@ def get_token(request):
     """Функция получения токена при регистрации."""
     serializer = TokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    username = serializer.validated_data.get('username')
-    user = get_object_or_404(User, username=username)
-    confirmation_code = serializer.validated_data.get(
-        'confirmation_code'
+    user = get_confirmed_user(
+        serializer.validated_data.get('username'),
+        serializer.validated_data.get('confirmation_code')
     )
-    if default_token_generator.check_token(user, confirmation_code):
-        token = AccessToken.for_user(user)
+    if user is not None:
+        token = RoleAccessToken.for_user(user)
         return response.Response(
             {'token': str(token)}, status=status.HTTP_200_OK
         )
@@ -205,6 +323,11 @@ class MyUserViewSet(ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def me(self, request):
+        deferred = (request.user.get_deferred_fields()
+                    & set(self.get_serializer_class().Meta.fields))
+        if deferred:
+            # Пользователь из токена: профиль дочитывается одним запросом.
+            request.user.refresh_from_db(fields=deferred)
         if request.method == 'GET':
             return Response(
                 self.get_serializer(request.user).data,
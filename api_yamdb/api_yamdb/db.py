@@ -0,0 +1,139 @@
+"""Обслуживание соединений с базой данных и маршрутизация запросов."""
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject
+from rest_framework.permissions import SAFE_METHODS
+
+from api.cache import versions_shared
+
+_state = threading.local()
+
+
+def close_unhealthy_connections(**kwargs):
+    """Закрывает постоянные соединения, которые перестали отвечать.
+
+    С CONN_MAX_AGE соединение переживает запрос, и после перезапуска
+    сервера базы или пулера первый запрос получил бы ошибку. Соединения
+    с CONN_HEALTH_CHECKS проверяются в начале запроса, а неработающие
+    закрываются, чтобы Django открыл новое.
+    """
+    for connection in connections.all():
+        if (connection.connection is not None
+                and connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
+
+
+def sqlite_pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к новому соединению с SQLite.
+
+    Команды выполняются на самом соединении sqlite3, чтобы не попадать
+    в connection.queries и счётчики запросов.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for sql in sqlite_pragma_statements(settings.SQLITE_PRAGMAS):
+        connection.connection.execute(sql)
+
+
+def primary_pin_key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def request_user_id(request):
+    """id пользователя, уже определённого DRF, или None.
+
+    Ленивый пользователь AuthenticationMiddleware не вычисляется:
+    для этого понадобился бы запрос к базе изнутри маршрутизатора.
+    """
+    user = request.__dict__.get('user')
+    if user is None or type(user) is SimpleLazyObject:
+        return None
+    return user.pk if user.is_authenticated else None
+
+
+class ReplicaRoutingMiddleware:
+    """Делает текущий запрос видимым для PrimaryReplicaRouter и после
+    успешной записи закрепляет пользователя за основной базой на
+    READ_YOUR_WRITES_SECONDS секунд.
+
+    Закрепление хранится в кэше API, поэтому с репликами кэш должен
+    быть общим для всех процессов: иначе следующий запрос попадёт
+    в процесс, не знающий о записи, и прочитает отстающую реплику."""
+
+    def __init__(self, get_response):
+        if settings.DATABASE_REPLICAS and not versions_shared():
+            raise ImproperlyConfigured(
+                'DATABASE_REPLICAS требует общего для процессов кэша '
+                f'в CACHES[{settings.API_CACHE_ALIAS!r}], например Redis '
+                'или Memcached: в локальном кэше процесса закрепление '
+                'за основной базой не видно другим процессам.'
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.request = request
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.request = None
+        user_id = request_user_id(request)
+        if (request.method not in SAFE_METHODS and user_id is not None
+                and response.status_code < 400):
+            caches[settings.API_CACHE_ALIAS].set(
+                primary_pin_key(user_id), True,
+                settings.READ_YOUR_WRITES_SECONDS
+            )
+        return response
+
+
+class PrimaryReplicaRouter:
+    """Отправляет чтения безопасных HTTP-запросов на реплики из
+    DATABASE_REPLICAS, а всё остальное на основную базу.
+
+    Основная база читается в небезопасных запросах, внутри транзакций,
+    вне HTTP-запросов (команды управления) и для пользователей,
+    недавно что-то записавших, чтобы они видели свои изменения.
+    """
+
+    def use_primary(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        pinned = request.__dict__.get('_db_use_primary')
+        if pinned is None:
+            user_id = request_user_id(request)
+            if user_id is None:
+                # Пользователь ещё не определён, решение не запоминается.
+                return False
+            pinned = bool(caches[settings.API_CACHE_ALIAS].get(
+                primary_pin_key(user_id)
+            ))
+            request._db_use_primary = pinned
+        return pinned
+
+    def db_for_read(self, model, **hints):
+        request = getattr(_state, 'request', None)
+        if (not settings.DATABASE_REPLICAS or request is None
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block
+                or self.use_primary(request)):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
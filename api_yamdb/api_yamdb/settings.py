@@ -28,6 +28,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api_yamdb.db.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,10 +59,72 @@ TEMPLATES = [
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 
-DATABASES = {
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
+
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        }
+    }
+else:
+    # Соединение живёт CONN_MAX_AGE секунд и проверяется в начале запроса
+    # (api_yamdb.db.close_unhealthy_connections). За пулером в режиме
+    # transaction, например PgBouncer, серверные курсоры не работают:
+    # DB_POOLER=1 отключает их.
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.getenv('DB_NAME', 'postgres'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_POOLER', '') == '1',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+
+# Реплики для чтения: копии основной базы на хостах из DB_REPLICA_HOSTS.
+# PrimaryReplicaRouter отправляет на них чтения GET-запросов, а после
+# записи READ_YOUR_WRITES_SECONDS секунд читает данные автора
+# из основной базы. В тестах реплики смотрят в тестовую основную базу.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['api_yamdb.db.PrimaryReplicaRouter']
+READ_YOUR_WRITES_SECONDS = 5
+
+# Применяются к каждому новому соединению с SQLite
+# (api_yamdb.db.set_sqlite_pragmas). WAL позволяет читать во время
+# записи, synchronous=NORMAL в WAL не теряет целостность при сбое.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'api_yamdb'),
     }
 }
 
@@ -102,22 +165,47 @@ AUTH_USER_MODEL = 'users.User'
 reserved_name = 'me'
 message_for_reservad_name = 'Имя пользователя "me" использовать нельзя!'
 message_for_user_not_found = 'Пользователя с таким именем нет!'
+message_for_duplicate_review = 'Вы уже оставляли отзыв на это произведение'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 DEFAULT_FROM_EMAIL = 's.m.m21-08-90@mail.ru'
 
+# Очередь исходящих писем (users.outbox).
+EMAIL_OUTBOX_EAGER = False
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_SECONDS = 30
+EMAIL_OUTBOX_POLL_SECONDS = 10
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+
+    # Корзины жетонов (api.throttling): области auth, writes и reads
+    # назначаются представлениям, скорости задаются на адрес клиента,
+    # пользователя и всё представление.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.IPThrottle',
+        'api.throttling.UserThrottle',
+        'api.throttling.EndpointThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'auth.ip': '30/min',
+        'auth.endpoint': '600/min',
+        'writes.ip': '300/min',
+        'writes.user': '120/min',
+        'reads.ip': '1200/min',
+        'reads.user': '1200/min',
+    },
 }
 
 SIMPLE_JWT = {
@@ -126,4 +214,9 @@ SIMPLE_JWT = {
 }
 
 PAGINATOR_PAGE_ITEMS_COUNT = 10
+
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 60 * 5
+CONFIRMATION_CODE_CACHE_TIMEOUT = 60 * 5
+AUTH_USER_CACHE_TIMEOUT = 60
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
@@ -11,6 +11,9 @@ class Review(models.Model):
     text = models.TextField(verbose_name='Отзыв', help_text='Напишите отзыв')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Время последнего изменения для ETag и Last-Modified ленты отзывов.
+    modified = models.DateTimeField(auto_now=True,
+                                    verbose_name='Дата изменения')
     score = models.PositiveSmallIntegerField(validators=[MinValueValidator(1),
                                              MaxValueValidator(10)])
 
@@ -22,6 +25,26 @@ class Review(models.Model):
             models.UniqueConstraint(fields=['title', 'author'],
                                     name='unique review')
         ]
+        indexes = [
+            models.Index(fields=['title', '-pub_date', 'score'],
+                         name='review_title_pub_date_idx'),
+            models.Index(fields=['title', 'modified'],
+                         name='review_title_modified_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded_values = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженную оценку для пересчёта рейтинга."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in ('title_id', 'score')
+        }
+        return instance
 
 
 class Comment(models.Model):
@@ -30,9 +53,17 @@ class Comment(models.Model):
     text = models.TextField(verbose_name='Комментарий',
                             help_text='Введите текст комментария')
     pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True,
+                                    verbose_name='Дата изменения')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['review', '-pub_date'],
+                         name='comment_review_pub_date_idx'),
+            models.Index(fields=['review', 'modified'],
+                         name='comment_review_modified_idx'),
+        ]
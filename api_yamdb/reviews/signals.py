@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Review
+from titles.models import Title
+
+
+@receiver(post_save, sender=Review)
+def update_title_rating_on_save(sender, instance, created, **kwargs):
+    """Переносит оценку нового или изменённого отзыва в агрегаты
+    произведения."""
+    score = int(instance.score)
+    titles = Title.objects.filter(pk=instance.title_id)
+    loaded = instance._loaded_values
+    if created:
+        titles.add_scores(score, 1)
+    elif 'score' not in loaded or 'title_id' not in loaded:
+        titles.recalculate_rating()
+    elif loaded['title_id'] != instance.title_id:
+        Title.objects.filter(pk=loaded['title_id']).add_scores(
+            -loaded['score'], -1)
+        titles.add_scores(score, 1)
+    elif loaded['score'] != score:
+        titles.add_scores(score - loaded['score'], 0)
+    instance._loaded_values = {'title_id': instance.title_id, 'score': score}
+
+
+@receiver(post_delete, sender=Review)
+def update_title_rating_on_delete(sender, instance, **kwargs):
+    """Убирает оценку удалённого отзыва из агрегатов произведения."""
+    Title.objects.filter(pk=instance.title_id).add_scores(
+        -int(instance.score), -1)
@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class TitlesConfig(AppConfig):
     name = 'titles'
+
+    def ready(self):
+        from titles import signals
+        post_migrate.connect(signals.rebuild_search_index, sender=self)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import touch
+from titles.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сумму оценок, число отзывов и рейтинг произведений'
+
+    def handle(self, *args, **options):
+        updated = Title.objects.recalculate_rating()
+        # UPDATE не посылает сигналов: кэш ответов сбрасывается явно.
+        touch('titles')
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан для произведений: {updated}'
+        ))
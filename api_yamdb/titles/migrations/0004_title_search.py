@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from titles import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0003_title_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,5 +1,10 @@
 from api.validators import year_validation
+from django.apps import apps
 from django.db import models
+from django.db.models import (Avg, Count, ExpressionWrapper, F, OuterRef,
+                              Subquery, Sum)
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
 
 
 class Category(models.Model):
@@ -41,6 +46,51 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+    """Обновление денормализованных агрегатов оценок произведений."""
+
+    def add_scores(self, score_delta, count_delta):
+        """Сдвигает сумму оценок и число отзывов одним UPDATE.
+
+        Выражения в SET вычисляются по значениям строки до обновления,
+        поэтому рейтинг считается от уже сдвинутых суммы и количества.
+        """
+        score_sum = F('score_sum') + score_delta
+        review_count = F('review_count') + count_delta
+        return self.update(
+            modified=timezone.now(),
+            score_sum=score_sum,
+            review_count=review_count,
+            rating=ExpressionWrapper(
+                Cast(score_sum, models.FloatField())
+                / NullIf(review_count, 0),
+                output_field=models.FloatField()
+            )
+        )
+
+    def recalculate_rating(self):
+        """Пересчитывает агрегаты оценок по таблице отзывов."""
+        reviews = apps.get_model('reviews', 'Review').objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            modified=timezone.now(),
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score'))
+                         .values('total')), 0),
+            review_count=Coalesce(
+                Subquery(reviews.annotate(total=Count('pk'))
+                         .values('total')), 0),
+            rating=Subquery(reviews.annotate(avg=Avg('score'))
+                            .values('avg')),
+        )
+
+    def touch(self):
+        """Отмечает изменение представления произведений, например
+        после переименования их категории или жанра."""
+        return self.update(modified=timezone.now())
+
+
 class Title(models.Model):
     """Модель произведения."""
     name = models.CharField(max_length=256, db_index=True,
@@ -56,10 +106,24 @@ class Title(models.Model):
                                  related_name="titles", blank=True, null=True)
     genre = models.ManyToManyField(Genre, verbose_name='Жанр',
                                    related_name="titles", blank=True)
-    rating = models.IntegerField(null=True, default=None)
+    score_sum = models.PositiveIntegerField(default=0,
+                                            verbose_name='Сумма оценок')
+    review_count = models.PositiveIntegerField(default=0,
+                                               verbose_name='Число отзывов')
+    rating = models.FloatField(null=True, default=None, db_index=True,
+                               verbose_name='Рейтинг')
+    # Время последнего изменения, видимого в ответе API. Его меняют и
+    # UPDATE в обход save(): агрегаты оценок и TitleQuerySet.touch().
+    modified = models.DateTimeField(auto_now=True, db_index=True,
+                                    verbose_name='Дата изменения')
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-year',)
+        ordering = ('-year', 'name')
+        indexes = (
+            models.Index(fields=('-year', 'name'), name='title_year_name_idx'),
+        )
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
@@ -0,0 +1,173 @@
+"""Поиск произведений по названию, категории и жанрам.
+
+На SQLite документ произведения хранится в виртуальной таблице FTS5,
+которую обновляют сигналы приложения titles. На PostgreSQL поиск идёт
+через icontains, который ускоряют GIN-индексы pg_trgm. На остальных
+базах, на SQLite без FTS5 и на PostgreSQL без pg_trgm остаётся поиск
+перебором через icontains.
+"""
+import re
+
+from django.db import DatabaseError, OperationalError, transaction
+from django.db.models import Q
+
+SEARCH_TABLE = 'titles_title_search'
+TRIGRAM_COLUMNS = (
+    ('titles_title', 'name'),
+    ('titles_category', 'name'),
+    ('titles_category', 'slug'),
+    ('titles_genre', 'name'),
+    ('titles_genre', 'slug'),
+)
+
+DOCUMENT_SQL = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, name, category, genre)
+    SELECT title.id, title.name,
+           COALESCE(category.name || ' ' || category.slug, ''),
+           COALESCE((SELECT group_concat(genre.name || ' ' || genre.slug, ' ')
+                     FROM titles_title_genre AS title_genre
+                     JOIN titles_genre AS genre
+                       ON genre.id = title_genre.genre_id
+                     WHERE title_genre.title_id = title.id), '')
+    FROM titles_title AS title
+    LEFT JOIN titles_category AS category
+      ON category.id = title.category_id
+"""
+
+_fts_connections = set()
+
+
+def fts_available(connection):
+    """Есть ли в базе таблица FTS5 для поиска."""
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_connections:
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        if SEARCH_TABLE not in tables:
+            return False
+        _fts_connections.add(connection.alias)
+    return True
+
+
+def create_index(connection):
+    """Создаёт поисковую таблицу или индексы для текущей базы."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+                    'USING fts5(name, category, genre, '
+                    "tokenize='unicode61 remove_diacritics 2', "
+                    "prefix='2 3')"
+                )
+            except OperationalError:
+                # SQLite собран без FTS5: поиск останется на icontains.
+                return
+            rebuild(connection)
+        elif connection.vendor == 'postgresql':
+            try:
+                with transaction.atomic(using=connection.alias):
+                    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            except DatabaseError:
+                # На сервере нет расширения: поиск останется на icontains.
+                return
+            for table, column in TRIGRAM_COLUMNS:
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm '
+                    f'ON {table} USING gin (UPPER({column}) gin_trgm_ops)'
+                )
+
+
+def drop_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+            _fts_connections.discard(connection.alias)
+        elif connection.vendor == 'postgresql':
+            for table, column in TRIGRAM_COLUMNS:
+                cursor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+
+
+def rebuild(connection):
+    """Заново строит документы всех произведений."""
+    if not fts_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(DOCUMENT_SQL)
+
+
+def _reindex(connection, where, params):
+    if not fts_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN '
+            f'(SELECT title.id FROM titles_title AS title WHERE {where})',
+            params
+        )
+        cursor.execute(f'{DOCUMENT_SQL} WHERE {where}', params)
+
+
+def update_titles(connection, title_ids):
+    """Обновляет документы произведений с указанными id."""
+    title_ids = list(title_ids)
+    if title_ids:
+        placeholders = ', '.join(['%s'] * len(title_ids))
+        _reindex(connection, f'title.id IN ({placeholders})', title_ids)
+
+
+def update_category(connection, category_id):
+    """Обновляет документы произведений категории."""
+    _reindex(connection, 'title.category_id = %s', [category_id])
+
+
+def update_genre(connection, genre_id):
+    """Обновляет документы произведений жанра."""
+    _reindex(
+        connection,
+        'title.id IN (SELECT title_id FROM titles_title_genre '
+        'WHERE genre_id = %s)',
+        [genre_id]
+    )
+
+
+def remove_titles(connection, title_ids):
+    title_ids = list(title_ids)
+    if title_ids and fts_available(connection):
+        placeholders = ', '.join(['%s'] * len(title_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} '
+                f'WHERE rowid IN ({placeholders})',
+                title_ids
+            )
+
+
+def search_titles(queryset, value, connection):
+    """Оставляет произведения, где каждое слово запроса начинает слово
+    в названии, категории или жанрах (без FTS5 — входит в них)."""
+    tokens = re.findall(r'\w+', value)
+    if not tokens:
+        return queryset
+    if fts_available(connection):
+        query = ' '.join(f'"{token}"*' for token in tokens)
+        # RawSQL внутри __in получает лишние скобки, и SQLite считает
+        # подзапрос скалярным, поэтому условие передаётся через extra.
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        return queryset.extra(
+            where=[f'{table}.id IN (SELECT rowid FROM {SEARCH_TABLE} '
+                   f'WHERE {SEARCH_TABLE} MATCH %s)'],
+            params=[query]
+        )
+    matches = queryset.model.objects.all()
+    for token in tokens:
+        matches = matches.filter(
+            Q(name__icontains=token)
+            | Q(category__name__icontains=token)
+            | Q(category__slug__icontains=token)
+            | Q(genre__name__icontains=token)
+            | Q(genre__slug__icontains=token)
+        )
+    return queryset.filter(id__in=matches.values('id'))
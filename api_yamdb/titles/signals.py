@@ -0,0 +1,73 @@
+from django.db import connections
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from titles import search
+from titles.models import Category, Genre, Title
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, using, **kwargs):
+    search.update_titles(connections[using], [instance.pk])
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, using, **kwargs):
+    search.remove_titles(connections[using], [instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def index_title_genres(sender, instance, action, reverse, pk_set, using,
+                       **kwargs):
+    """Обновляет документы после изменения связей произведений
+    с жанрами с любой стороны."""
+    if action == 'pre_clear' and reverse:
+        instance._search_title_ids = list(
+            instance.titles.values_list('pk', flat=True)
+        )
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        title_ids = [instance.pk]
+    elif action == 'post_clear':
+        title_ids = instance.__dict__.pop('_search_title_ids', [])
+    else:
+        title_ids = pk_set
+    search.update_titles(connections[using], title_ids)
+    Title.objects.using(using).filter(pk__in=title_ids).touch()
+
+
+@receiver(post_save, sender=Category)
+def index_category_titles(sender, instance, using, **kwargs):
+    search.update_category(connections[using], instance.pk)
+    Title.objects.using(using).filter(category=instance.pk).touch()
+
+
+@receiver(post_save, sender=Genre)
+def index_genre_titles(sender, instance, using, **kwargs):
+    search.update_genre(connections[using], instance.pk)
+    Title.objects.using(using).filter(genre=instance.pk).touch()
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def remember_titles_before_delete(sender, instance, **kwargs):
+    """Запоминает произведения, которые потеряют категорию или жанр."""
+    instance._search_title_ids = list(
+        instance.titles.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def index_titles_after_delete(sender, instance, using, **kwargs):
+    title_ids = instance.__dict__.pop('_search_title_ids', [])
+    search.update_titles(connections[using], title_ids)
+    Title.objects.using(using).filter(pk__in=title_ids).touch()
+
+
+def rebuild_search_index(sender, using, **kwargs):
+    """После migrate и flush заново строит поисковые документы: эти
+    команды меняют таблицы в обход сигналов моделей."""
+    search.rebuild(connections[using])
@@ -0,0 +1,18 @@
+"""Ключи кэша аутентификации пользователя.
+
+Кэш заполняют api.authentication и выдача токена в api.views, а сбрасывают
+сигналы users.signals, поэтому ключи живут в приложении пользователей.
+"""
+import hashlib
+
+
+def user_snapshot_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def token_version_key(user_id):
+    return f'auth:token_version:{user_id}'
+
+
+def confirmed_code_key(username):
+    return f'auth:confirmed:{hashlib.sha256(username.encode()).hexdigest()}'
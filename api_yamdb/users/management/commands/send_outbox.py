@@ -0,0 +1,40 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.outbox import send_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Отправляет письма из очереди, время которых пришло. '
+            'С --loop работает как отдельный обработчик очереди.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, проверяя очередь раз в '
+                 'EMAIL_OUTBOX_POLL_SECONDS секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            sent = send_pending()
+            self.stdout.write(f'Обработано писем: {sent}')
+            return
+        while True:
+            try:
+                sent = send_pending()
+            except Exception:
+                # Обработчик не останавливается из-за сбоя одного прохода.
+                logger.exception('Ошибка отправки очереди писем')
+            else:
+                if sent:
+                    self.stdout.write(f'Обработано писем: {sent}')
+            finally:
+                close_old_connections()
+            time.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
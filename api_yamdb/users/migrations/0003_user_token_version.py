@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Растёт при смене роли или статуса, отзывая выданные токены с ролью', verbose_name='Версия токенов'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.utils import timezone
 
 from api_yamdb.settings import message_for_reservad_name, reserved_name
 
@@ -45,13 +46,61 @@ class User(AbstractUser):
         max_length=254, verbose_name='email',
         unique=True)
 
+    token_version = models.PositiveIntegerField(
+        default=0, verbose_name='Версия токенов',
+        help_text='Растёт при смене роли или статуса, отзывая выданные '
+                  'токены с ролью')
+
     REQUIRED_FIELDS = ('email', 'password')
 
+    # Поля, значения которых попадают в токен (api.authentication).
+    ACCESS_FIELDS = ('role', 'is_staff', 'is_superuser', 'is_active')
+    # Загруженные значения этих полей запоминаются: права — для отзыва
+    # токенов, username — для сброса кэша кода после переименования.
+    LOADED_FIELDS = (*ACCESS_FIELDS, 'username')
+
     class Meta:
         ordering = ('id',)
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded_values = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженные права для отзыва токенов."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.LOADED_FIELDS
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        """Запоминает и дочитанные из базы поля."""
+        super().refresh_from_db(using, fields)
+        self._loaded_values.update({
+            name: getattr(self, name) for name in self.LOADED_FIELDS
+            if (fields is None or name in fields) and name in self.__dict__
+        })
+
+    def save(self, *args, **kwargs):
+        """Увеличивает token_version, если изменились права."""
+        loaded = self._loaded_values
+        if any(name in loaded and loaded[name] != getattr(self, name)
+               for name in self.ACCESS_FIELDS):
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            name: getattr(self, name) for name in self.LOADED_FIELDS
+            if name in self.__dict__
+        }
+
     @property
     def is_admin(self):
         return self.is_staff or self.role == ADMIN
@@ -63,3 +112,34 @@ class User(AbstractUser):
     @property
     def is_user(self):
         return self.role == USER
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (users.outbox)."""
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    from_email = models.EmailField(max_length=254,
+                                   verbose_name='Отправитель')
+    to = models.EmailField(max_length=254, verbose_name='Получатель')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Поставлено в очередь')
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Следующая попытка')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попыток')
+    last_error = models.TextField(blank=True,
+                                  verbose_name='Последняя ошибка')
+    sent_at = models.DateTimeField(null=True, blank=True,
+                                   verbose_name='Отправлено')
+
+    class Meta:
+        ordering = ('next_attempt_at',)
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(fields=['sent_at', 'next_attempt_at'],
+                         name='outgoing_email_due_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
@@ -0,0 +1,161 @@
+"""Очередь исходящих писем.
+
+Письмо сохраняется в таблицу OutgoingEmail в транзакции запроса,
+а отправляет его фоновый поток процесса: пачками по
+EMAIL_OUTBOX_BATCH_SIZE через одно соединение с почтовым сервером.
+Неудачная отправка повторяется с растущей паузой, пока число попыток
+не достигнет EMAIL_OUTBOX_MAX_ATTEMPTS. С EMAIL_OUTBOX_EAGER письма
+отправляются сразу после фиксации транзакции, без потока.
+
+Текст отправленного или окончательно не отправленного письма
+стирается: в нём код подтверждения, который обменивается на токен.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from users.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+# Время, на которое обработчик забирает письма себе. Другие процессы
+# не возьмут их, пока оно не истечёт.
+CLAIM_SECONDS = 60
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    """Ставит письмо в очередь и будит отправку после фиксации."""
+    email = OutgoingEmail.objects.create(
+        subject=subject, body=body, to=to,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+    if settings.EMAIL_OUTBOX_EAGER:
+        transaction.on_commit(send_pending)
+    else:
+        transaction.on_commit(worker.wake)
+    return email
+
+
+def claim_due(batch_size):
+    """Забирает до batch_size писем, время отправки которых пришло."""
+    now = timezone.now()
+    due = OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        next_attempt_at__lte=now,
+        attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    )
+    ids = list(due.values_list('id', flat=True)[:batch_size])
+    claimed_until = now + timedelta(seconds=CLAIM_SECONDS)
+    due.filter(id__in=ids).update(next_attempt_at=claimed_until)
+    return list(OutgoingEmail.objects.filter(
+        id__in=ids, next_attempt_at=claimed_until
+    ))
+
+
+def record_failure(email, error):
+    """Записывает ошибку попытки и откладывает следующую."""
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        # Письмо больше не отправится: код подтверждения не хранится.
+        email.body = ''
+    email.last_error = str(error)
+    email.next_attempt_at = timezone.now() + timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_SECONDS
+        * 2 ** (email.attempts - 1)
+    )
+    logger.warning('Не удалось отправить письмо %s: %s', email.pk, error)
+
+
+def save_result(email):
+    email.save(update_fields=(
+        'body', 'attempts', 'last_error', 'next_attempt_at', 'sent_at'
+    ))
+
+
+def send_batch(emails):
+    """Отправляет письма через одно соединение, отмечая результат.
+    Возвращает False, если не удалось подключиться к серверу."""
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        # Сервер недоступен: попытка засчитывается всем забранным письмам.
+        for email in emails:
+            email.attempts += 1
+            record_failure(email, error)
+            save_result(email)
+        return False
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, [email.to],
+                connection=connection
+            )
+            email.attempts += 1
+            try:
+                message.send()
+            except Exception as error:
+                record_failure(email, error)
+            else:
+                email.sent_at = timezone.now()
+                # В тексте код подтверждения, который обменивается на
+                # токен: после отправки он в базе не нужен.
+                email.body = ''
+            save_result(email)
+    finally:
+        connection.close()
+    return True
+
+
+def send_pending():
+    """Отправляет все письма, время которых пришло; возвращает число
+    обработанных писем."""
+    processed = 0
+    while True:
+        emails = claim_due(settings.EMAIL_OUTBOX_BATCH_SIZE)
+        if not emails:
+            return processed
+        processed += len(emails)
+        if not send_batch(emails):
+            # Остальные письма ждут, пока сервер снова станет доступен.
+            return processed
+
+
+class OutboxWorker:
+    """Фоновый поток отправки, один на процесс.
+
+    Запускается при первом письме, просыпается по wake() или раз
+    в EMAIL_OUTBOX_POLL_SECONDS, чтобы повторить отложенные письма.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def wake(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='email-outbox', daemon=True
+                )
+                self.thread.start()
+        self.event.set()
+
+    def run(self):
+        while True:
+            self.event.wait(settings.EMAIL_OUTBOX_POLL_SECONDS)
+            self.event.clear()
+            try:
+                send_pending()
+            except Exception:
+                logger.exception('Ошибка отправки очереди писем')
+            finally:
+                close_old_connections()
+
+
+worker = OutboxWorker()
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.cache import (confirmed_code_key, token_version_key,
+                         user_snapshot_key)
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_user_auth_cache(sender, instance, **kwargs):
+    """Сбрасывает кэши аутентификации пользователя после изменения роли
+    или профиля."""
+    keys = [user_snapshot_key(instance.pk), token_version_key(instance.pk)]
+    # После переименования проверенный код остался под прежним именем.
+    usernames = {instance.username,
+                 instance._loaded_values.get('username', instance.username)}
+    keys += [confirmed_code_key(username) for username in usernames]
+    transaction.on_commit(
+        lambda: caches[settings.API_CACHE_ALIAS].delete_many(keys)
+    )
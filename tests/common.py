@@ -1,4 +1,7 @@
+import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -113,3 +116,18 @@ def create_comments(admin_client, admin):
     result.append({'id': create_comment(client_moderator, titles[0]["id"], reviews[0]["id"], 'qwerty321'),
                    'author': moderator.username, 'text': 'qwerty321'})
     return result, reviews, titles, user, moderator
+
+
+def sorted_query_plans(client, url):
+    """Планы SQLite для запросов с ORDER BY, выполненных при GET url."""
+    if connection.vendor != 'sqlite':
+        pytest.skip('EXPLAIN QUERY PLAN есть только в SQLite')
+    with CaptureQueriesContext(connection) as context:
+        client.get(url)
+    plans = []
+    with connection.cursor() as cursor:
+        for query in context.captured_queries:
+            if 'ORDER BY' in query['sql']:
+                cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                plans.append(' '.join(str(row[-1]) for row in cursor.fetchall()))
+    return plans
@@ -224,6 +224,27 @@ class Test00UserRegistration:
             f'но невалидным confirmation_code, возвращается статус {code}'
         )
 
+    @pytest.mark.django_db(transaction=True)
+    def test_00_obtain_jwt_token_query_count(self, client, django_assert_num_queries):
+        from django.contrib.auth.tokens import default_token_generator
+
+        user = User.objects.create_user('token_user', 'token_user@yamdb.fake', None)
+        data = {'username': user.username, 'confirmation_code': default_token_generator.make_token(user)}
+        with django_assert_num_queries(1):
+            response = client.post(self.url_token, data=data)
+        assert response.status_code == 200 and 'token' in response.json(), (
+            f'Проверьте, что при POST запросе `{self.url_token}` с верным кодом '
+            'пользователь читается одним запросом'
+        )
+        with django_assert_num_queries(0):
+            response = client.post(self.url_token, data=data)
+        assert response.status_code == 200 and 'token' in response.json(), (
+            f'Проверьте, что повторный POST запрос `{self.url_token}` с проверенным кодом '
+            'не обращается к базе данных'
+        )
+        response = client.post(self.url_token, data={'username': user.username, 'confirmation_code': 'wrong'})
+        assert response.status_code == 400
+
     @pytest.mark.django_db(transaction=True)
     def test_00_registration_me_username_restricted(self, client):
         valid_email = 'valid@yamdb.fake'
@@ -279,3 +300,39 @@ class Test00UserRegistration:
             f'Проверьте, что при {request_type} запросе `{self.url_signup}` нельзя создать '
             f'пользователя, username которого уже зарегистрирован и возвращается статус {code}'
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_repeated_signup_resends_code(self, client, settings, monkeypatch,
+                                             django_assert_max_num_queries):
+        from users.outbox import worker
+        settings.EMAIL_OUTBOX_EAGER = False
+        monkeypatch.setattr(worker, 'wake', lambda: None)
+        data = {'email': 'repeat@yamdb.fake', 'username': 'repeat_user'}
+
+        # BEGIN, поиск пользователя, создание пользователя и письма.
+        with django_assert_max_num_queries(4):
+            response = client.post(self.url_signup, data=data)
+        assert response.status_code == 200, (
+            f'Проверьте, что POST запрос `{self.url_signup}` с новыми данными '
+            'ищет пользователя одним запросом и создаёт его без повторного чтения'
+        )
+        with django_assert_max_num_queries(3):
+            response = client.post(self.url_signup, data=data)
+        assert response.status_code == 200 and response.json() == data, (
+            f'Проверьте, что повторный POST запрос `{self.url_signup}` с теми же '
+            'username и email возвращает статус 200 и заново отправляет код'
+        )
+        assert User.objects.filter(username='repeat_user').count() == 1
+        from users.models import OutgoingEmail
+        bodies = list(OutgoingEmail.objects.filter(
+            to='repeat@yamdb.fake').values_list('body', flat=True))
+        assert len(bodies) == 2 and bodies[0] == bodies[1], (
+            f'Проверьте, что повторный POST запрос `{self.url_signup}` отправляет '
+            'тот же код подтверждения'
+        )
+        response = client.post(self.url_signup, data={
+            'email': 'other@yamdb.fake', 'username': 'repeat_user'})
+        assert response.status_code == 400 and 'username' in response.json(), (
+            f'Проверьте, что POST запрос `{self.url_signup}` с занятым username '
+            'и другим email возвращает ошибку поля username'
+        )
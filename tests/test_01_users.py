@@ -571,3 +571,90 @@ class Test01UserAPI:
             'Проверьте, что при PATCH запросе `/api/v1/users/me/`, '
             'пользователь с ролью user не может сменить себе роль'
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_authenticated_user_cache(self, admin_client, user_client, user, django_assert_num_queries):
+        user_client.get('/api/v1/users/me/')
+        with django_assert_num_queries(0):
+            response = user_client.get('/api/v1/users/me/')
+        assert response.json()['username'] == user.username, (
+            'Проверьте, что при повторном запросе пользователь берётся из кэша без запроса к базе'
+        )
+        response = user_client.get('/api/v1/users/')
+        assert response.status_code == 403
+        admin_client.patch(f'/api/v1/users/{user.username}/', data={'role': 'admin', 'bio': 'new bio'})
+        response = user_client.get('/api/v1/users/me/')
+        assert response.json()['role'] == 'admin' and response.json()['bio'] == 'new bio', (
+            'Проверьте, что изменение роли и профиля пользователя сбрасывает его кэш'
+        )
+        assert user_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что права доступа учитывают новую роль сразу после изменения'
+        )
+        user_client.patch('/api/v1/users/me/', data={'first_name': 'Новое имя'})
+        assert user_client.get('/api/v1/users/me/').json()['first_name'] == 'Новое имя', (
+            'Проверьте, что изменение профиля через `/api/v1/users/me/` сбрасывает кэш пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_13_role_token(self, admin_client, django_assert_num_queries):
+        from rest_framework.test import APIClient
+
+        from api.authentication import RoleAccessToken
+
+        user = get_user_model().objects.create_user(
+            username='RoleAdmin', email='roleadmin@yamdb.fake', password=None, role='admin', bio='role bio'
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}')
+        assert client.get('/api/v1/users/').status_code == 200
+        with django_assert_num_queries(0):
+            response = client.post('/api/v1/categories/', data={'name': 'Фильм', 'slug': ''})
+        assert response.status_code == 400, (
+            'Проверьте, что права администратора проверяются по роли из токена без запросов к базе'
+        )
+        response = client.get('/api/v1/users/me/')
+        assert response.json()['bio'] == 'role bio' and response.json()['role'] == 'admin', (
+            'Проверьте, что `/api/v1/users/me/` возвращает профиль пользователя с токеном с ролью'
+        )
+        admin_client.patch(f'/api/v1/users/{user.username}/', data={'role': 'user'})
+        assert client.get('/api/v1/users/').status_code == 401, (
+            'Проверьте, что после смены роли выданные токены с ролью отзываются'
+        )
+        user.refresh_from_db()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}')
+        assert client.get('/api/v1/users/').status_code == 403, (
+            'Проверьте, что новый токен несёт новую роль'
+        )
+        admin_client.patch(f'/api/v1/users/{user.username}/', data={'bio': 'другое'})
+        assert client.get('/api/v1/users/me/').json()['bio'] == 'другое', (
+            'Проверьте, что изменение профиля без смены роли не отзывает токен'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_14_role_token_rename(self, client):
+        from django.contrib.auth.tokens import default_token_generator
+        from rest_framework.test import APIClient
+
+        user = get_user_model().objects.create_user(
+            username='alice', email='alice@yamdb.fake', password=None
+        )
+        code = default_token_generator.make_token(user)
+        response = client.post('/api/v1/auth/token/', data={'username': 'alice', 'confirmation_code': code})
+        assert response.status_code == 200
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+
+        api_client.patch('/api/v1/users/me/', data={'username': 'alice2'})
+        assert api_client.get('/api/v1/users/me/').json()['username'] == 'alice2', (
+            'Проверьте, что после смены username `/api/v1/users/me/` возвращает новое имя, '
+            'а не имя из токена'
+        )
+        api_client.patch('/api/v1/users/me/', data={'bio': 'hi'})
+        user.refresh_from_db()
+        assert user.username == 'alice2' and user.bio == 'hi', (
+            'Проверьте, что изменение профиля через `/api/v1/users/me/` не возвращает прежний username'
+        )
+        response = client.post('/api/v1/auth/token/', data={'username': 'alice', 'confirmation_code': code})
+        assert response.status_code != 200, (
+            'Проверьте, что после смены username прежнее имя с проверенным кодом не выдаёт токен'
+        )
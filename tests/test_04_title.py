@@ -249,3 +249,219 @@ class Test04TitleAPI:
         user, moderator = create_users_api(admin_client)
         self.check_permissions(user, 'обычного пользователя', titles, categories, genres)
         self.check_permissions(moderator, 'модератора', titles, categories, genres)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_titles_list_query_count(self, client, admin_client, monkeypatch):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from api.pagination import Pagination
+
+        titles, categories, genres = create_titles(admin_client)
+        for year in range(1990, 1996):
+            data = {'name': f'Произведение {year}', 'year': year,
+                    'genre': [genres[0]['slug'], genres[2]['slug']],
+                    'category': categories[year % 2]['slug']}
+            admin_client.post('/api/v1/titles/', data=data)
+
+        queries = []
+        for page_size in (1, 8):
+            monkeypatch.setattr(Pagination, 'page_size', page_size)
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = client.get('/api/v1/titles/')
+            assert len(response.json()['results']) == page_size
+            queries.append(len(context))
+        assert queries[0] == queries[1], (
+            'Проверьте, что при GET запросе `/api/v1/titles/` число запросов к БД '
+            'не зависит от размера страницы: категории и жанры должны загружаться '
+            'через `select_related` и `prefetch_related`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_titles_cache(self, client, admin_client):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        titles, categories, genres = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        client.get('/api/v1/titles/')
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            list_response = client.get('/api/v1/titles/')
+            detail_response = client.get(url)
+        assert len(context) == 0 and detail_response.json()['name'] == titles[0]['name'], (
+            'Проверьте, что повторные GET запросы к `/api/v1/titles/` отдаются из кэша'
+        )
+        assert list_response.json()['count'] == 2
+
+        admin_client.post(f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': 'Ок', 'score': 8})
+        assert client.get(url).json()['rating'] == 8, (
+            'Проверьте, что кэш произведений сбрасывается при добавлении отзыва'
+        )
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Новое имя'})
+        assert client.get(url).json()['name'] == 'Новое имя', (
+            'Проверьте, что кэш произведений сбрасывается при изменении произведения'
+        )
+        admin_client.delete(f'/api/v1/categories/{categories[0]["slug"]}/')
+        assert client.get(url).json()['category'] is None, (
+            'Проверьте, что кэш произведений сбрасывается при удалении категории'
+        )
+        assert len(client.get('/api/v1/categories/').json()['results']) == 1, (
+            'Проверьте, что кэш категорий сбрасывается при удалении категории'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_titles_count_modes(self, client, admin_client, monkeypatch):
+        from api.pagination import Pagination
+
+        monkeypatch.setattr(Pagination, 'page_size', 1)
+        titles, categories, genres = create_titles(admin_client)
+        data = client.get('/api/v1/titles/?count=none').json()
+        assert data['count'] is None and len(data['results']) == 1 and 'page=2' in data['next'], (
+            'Проверьте, что при GET запросе `/api/v1/titles/?count=none` '
+            '`count` не считается, а ссылка `next` строится по лишней строке выборки'
+        )
+        data = client.get('/api/v1/titles/?count=none&page=2').json()
+        assert data['next'] is None and data['previous'], (
+            'Проверьте, что на последней странице без подсчёта `next` равен `None`'
+        )
+        assert client.get('/api/v1/titles/?count=cached').json()['count'] == 2
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Третье', 'year': 1999, 'genre': [genres[0]['slug']],
+            'category': categories[0]['slug']
+        })
+        assert client.get('/api/v1/titles/?count=cached').json()['count'] == 3, (
+            'Проверьте, что кэшированный `count` сбрасывается при добавлении произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_titles_search(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+
+        def search(value):
+            response = client.get('/api/v1/titles/', data={'search': value})
+            return sorted(title['id'] for title in response.json()['results'])
+
+        assert search('пово') == [titles[0]['id']], (
+            'Проверьте, что `search` находит произведения по началу слова в названии'
+        )
+        assert search('drama') == [titles[1]['id']], (
+            'Проверьте, что `search` находит произведения по slug жанра'
+        )
+        assert search('Фильм') == [titles[0]['id']], (
+            'Проверьте, что `search` находит произведения по названию категории'
+        )
+        assert search('комед туда') == [titles[0]['id']] and search('комед проект') == [], (
+            'Проверьте, что `search` требует совпадения всех слов запроса'
+        )
+        response = admin_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'genre': [genres[0]['slug']]})
+        assert response.status_code == 200, response.content
+        assert search('horror') == sorted(title['id'] for title in titles) and search('drama') == [], (
+            'Проверьте, что поиск учитывает изменение жанров произведения'
+        )
+        admin_client.delete(f'/api/v1/categories/{categories[0]["slug"]}/')
+        assert search('films') == [], (
+            'Проверьте, что поиск учитывает удаление категории'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert search('horror') == [titles[1]['id']], (
+            'Проверьте, что удалённое произведение не попадает в результаты поиска'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_09_titles_slug_filters(self, client, admin_client, django_assert_num_queries):
+        titles, categories, genres = create_titles(admin_client)
+        response = client.get('/api/v1/titles/', data={'genre': 'comed'})
+        assert response.json()['count'] == 0, (
+            'Проверьте, что фильтр `genre` ищет точное совпадение slug'
+        )
+        response = client.get('/api/v1/titles/', data={'genre_contains': 'comed'})
+        assert [title['id'] for title in response.json()['results']] == [titles[0]['id']], (
+            'Проверьте, что фильтр `genre_contains` ищет slug жанра по подстроке'
+        )
+        response = client.get('/api/v1/titles/', data={'category_contains': 'book'})
+        assert [title['id'] for title in response.json()['results']] == [titles[1]['id']], (
+            'Проверьте, что фильтр `category_contains` ищет slug категории по подстроке'
+        )
+        client.get('/api/v1/titles/', data={'category': categories[1]['slug']})
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/', data={'category': categories[1]['slug'], 'page': 1})
+        assert [title['id'] for title in response.json()['results']] == [titles[1]['id']], (
+            'Проверьте, что фильтр `category` берёт id категории из кэша, '
+            'не обращаясь к таблице категорий'
+        )
+        admin_client.post('/api/v1/genres/', data={'name': 'Мюзикл', 'slug': 'musical'})
+        admin_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'genre': ['musical']})
+        response = client.get('/api/v1/titles/', data={'genre': 'musical'})
+        assert [title['id'] for title in response.json()['results']] == [titles[1]['id']], (
+            'Проверьте, что фильтр `genre` находит жанры, созданные после заполнения кэша'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_10_titles_year_filters(self, client, admin_client):
+        from django.db import connection
+
+        from titles.models import Title
+
+        titles, categories, genres = create_titles(admin_client)
+
+        def filtered(**params):
+            response = client.get('/api/v1/titles/', data=params)
+            return [title['id'] for title in response.json()['results']]
+
+        assert filtered(year=2020) == [titles[1]['id']], (
+            'Проверьте, что фильтр `year` отбирает произведения по году выпуска'
+        )
+        assert filtered(year_min=2000, year_max=2019) == [titles[0]['id']], (
+            'Проверьте, что фильтры `year_min` и `year_max` задают диапазон лет включительно'
+        )
+        assert filtered(year_min=2000) == [titles[1]['id'], titles[0]['id']], (
+            'Проверьте, что произведения упорядочены по убыванию года'
+        )
+        if connection.vendor != 'sqlite':
+            return
+        sql, params = Title.objects.filter(year__gte=2000, year__lte=2010).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        assert 'title_year_name_idx' in plan and 'TEMP B-TREE' not in plan, (
+            'Проверьте, что выборка по диапазону лет идёт по индексу (year, name) без сортировки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_11_titles_conditional_get_with_local_cache(self, client, admin_client, settings, monkeypatch):
+        from titles.models import Genre
+
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        titles, categories, genres = create_titles(admin_client)
+        urls = ('/api/v1/titles/', f'/api/v1/titles/{titles[0]["id"]}/')
+        etags = {url: client.get(url).get('ETag') for url in urls}
+        assert all(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304 for url, etag in etags.items()), (
+            'Проверьте, что GET запрос `/api/v1/titles/` с актуальным `If-None-Match` возвращает статус 304'
+        )
+        # Запись в другом процессе не меняет локальную версию: ETag должен зависеть от базы.
+        monkeypatch.setattr('api.signals.touch', lambda *namespaces: None)
+
+        def changed(message, check):
+            for url in urls:
+                response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                assert response.status_code == 200, message
+                data = response.json()
+                title = next(item for item in data.get('results', [data]) if item['id'] == titles[0]['id'])
+                assert check(title), f'{message}, а ответ не берётся из устаревшего кэша'
+                etags[url] = response.get('ETag')
+
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'description': 'Другое'})
+        changed('Проверьте, что `ETag` произведений меняется после изменения произведения',
+                lambda title: title['description'] == 'Другое')
+        Genre.objects.get(slug=genres[2]['slug']).titles.add(titles[0]['id'])
+        changed('Проверьте, что `ETag` произведений меняется после изменения жанров произведения',
+                lambda title: genres[2] in title['genre'])
+        admin_client.post(f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': 'Отзыв', 'score': 7})
+        changed('Проверьте, что `ETag` произведений меняется после изменения рейтинга',
+                lambda title: title['rating'] == 7)
+        admin_client.delete(f'/api/v1/categories/{categories[0]["slug"]}/')
+        changed('Проверьте, что `ETag` произведений меняется после удаления их категории',
+                lambda title: title['category'] is None)
@@ -1,7 +1,7 @@
 import pytest
 
 from .common import (auth_client, create_reviews, create_titles,
-                     create_users_api)
+                     create_users_api, sorted_query_plans)
 
 
 class Test05ReviewAPI:
@@ -334,3 +334,155 @@ class Test05ReviewAPI:
             'без токена авторизации возвращается статус 401'
         )
         self.check_permissions(user, 'обычного пользователя', reviews, titles)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_review_rating_aggregates(self, client, admin_client, admin):
+        from django.core.management import call_command
+        from titles.models import Title
+
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.review_count, title.rating) == (12, 3, 4), (
+            'Проверьте, что сумма оценок, число отзывов и `rating` произведения '
+            'обновляются при создании отзыва'
+        )
+        client_moderator = auth_client(moderator)
+        client_moderator.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/')
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json().get('rating') == 3.5, (
+            'Проверьте, что `rating` произведения пересчитывается при удалении отзыва'
+        )
+        Title.objects.update(score_sum=0, review_count=0, rating=None)
+        call_command('recalculate_ratings')
+        title.refresh_from_db()
+        assert (title.score_sum, title.review_count, title.rating) == (7, 2, 3.5), (
+            'Проверьте, что команда `recalculate_ratings` пересчитывает агрегаты оценок'
+        )
+        from api.cache import touch
+
+        Title.objects.update(score_sum=0, review_count=0, rating=None)
+        touch('titles')
+        assert client.get(f'/api/v1/titles/{titles[0]["id"]}/').json().get('rating') is None
+        call_command('recalculate_ratings')
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json().get('rating') == 3.5, (
+            'Проверьте, что после команды `recalculate_ratings` кэш ответов произведений сбрасывается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_reviews_conditional_get(self, client, admin_client, admin):
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag = response.get('ETag')
+        assert etag and response.get('Last-Modified'), (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/reviews/` '
+            'возвращает заголовки `ETag` и `Last-Modified`'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/reviews/` '
+            'с актуальным `If-None-Match` возвращает статус 304'
+        )
+        assert client.get(f'{url}?page=2', HTTP_IF_NONE_MATCH=etag).status_code != 304, (
+            'Проверьте, что `ETag` зависит от параметров запроса'
+        )
+        client_user = auth_client(user)
+        client_user.patch(f'{url}{reviews[1]["id"]}/', data={'score': 9})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.get('ETag') != etag, (
+            'Проверьте, что после изменения отзыва `ETag` списка отзывов меняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_reviews_cursor_pagination(self, client, admin_client, admin, monkeypatch):
+        from api.pagination import CursorFeedPagination
+
+        monkeypatch.setattr(CursorFeedPagination, 'page_size', 2)
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/?pagination=cursor')
+        data = response.json()
+        assert response.status_code == 200 and len(data['results']) == 2 and 'count' not in data, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/reviews/?pagination=cursor` '
+            'возвращает страницу курсорной пагинации'
+        )
+        assert 'cursor=' in data['next'], (
+            'Проверьте, что ссылка `next` курсорной пагинации содержит параметр `cursor`'
+        )
+        next_page = client.get(data['next']).json()
+        ids = [review['id'] for review in data['results'] + next_page['results']]
+        assert sorted(ids) == sorted(review['id'] for review in reviews) and next_page['next'] is None, (
+            'Проверьте, что курсорная пагинация отзывов проходит по всем отзывам без повторов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_review_duplicate_error(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        self.create_review(admin_client, titles[0]['id'], 'Первый', 5)
+        response = admin_client.post(url, data={'text': 'Второй', 'score': 6})
+        assert response.status_code == 400 and response.json() == {
+            'non_field_errors': ['Вы уже оставляли отзыв на это произведение']
+        }, (
+            'Проверьте, что при повторном POST запросе `/api/v1/titles/{title_id}/reviews/` '
+            'возвращается статус 400 с сообщением о повторном отзыве'
+        )
+        assert len(admin_client.get(url).json()['results']) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_09_review_other_integrity_error(self, admin_client, monkeypatch):
+        from django.db import IntegrityError
+
+        from api.serializers import ReviewSerializer
+
+        titles, _, _ = create_titles(admin_client)
+
+        def save(serializer, **kwargs):
+            raise IntegrityError('FOREIGN KEY constraint failed')
+
+        monkeypatch.setattr(ReviewSerializer, 'save', save)
+        with pytest.raises(IntegrityError):
+            admin_client.post(f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': 'Отзыв', 'score': 5})
+
+    @pytest.mark.django_db(transaction=True)
+    def test_10_reviews_list_query_count(self, client, admin_client, admin, django_assert_max_num_queries):
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        self.create_review(auth_client(user), titles[1]['id'], 'Один', 6)
+        for title, expected in ((titles[1], 1), (titles[0], len(reviews))):
+            with django_assert_max_num_queries(3):
+                response = client.get(f'/api/v1/titles/{title["id"]}/reviews/')
+            results = response.json()['results']
+            assert len(results) == expected and all(review['author'] for review in results), (
+                'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/` '
+                'авторы отзывов загружаются одним запросом вместе с отзывами'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_11_reviews_list_uses_index_order(self, client, admin_client, admin):
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        for query in ('', '?pagination=cursor'):
+            plans = sorted_query_plans(client, url + query)
+            assert plans and all(
+                'review_title_pub_date_idx' in plan and 'TEMP B-TREE' not in plan for plan in plans
+            ), (
+                f'Проверьте, что GET запрос `{url + query}` читает отзывы по индексу '
+                f'(title_id, pub_date DESC) без сортировки: {plans}'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_reviews_conditional_get_with_local_cache(self, client, admin_client, admin, settings, monkeypatch):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        urls = (url, f'{url}{reviews[0]["id"]}/')
+        etags = {url: client.get(url).get('ETag') for url in urls}
+        # Запись в другом процессе не меняет локальную версию: ETag должен зависеть от базы.
+        monkeypatch.setattr('api.signals.touch', lambda *namespaces: None)
+        admin_client.patch(urls[1], data={'text': 'Исправленный отзыв'})
+        for url in urls:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            assert response.status_code == 200 and 'Исправленный отзыв' in response.content.decode(), (
+                'Проверьте, что `ETag` отзывов меняется после изменения отзыва, '
+                'даже если версия кэша не изменилась'
+            )
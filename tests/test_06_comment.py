@@ -1,6 +1,7 @@
 import pytest
 
-from .common import auth_client, create_comments, create_reviews
+from .common import (auth_client, create_comments, create_reviews,
+                     sorted_query_plans)
 
 
 class Test06CommentAPI:
@@ -246,3 +247,79 @@ class Test06CommentAPI:
             'без токена авторизации возвращается статус 401'
         )
         self.check_permissions(user, 'обычного пользователя', f'{pre_url}{comments[2]["id"]}/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_comments_conditional_get(self, client, admin_client, admin):
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        etag = client.get(url).get('ETag')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/reviews/{review_id}/comments/` '
+            'с актуальным `If-None-Match` возвращает статус 304'
+        )
+        admin_client.post(url, data={'text': 'Новый комментарий'})
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что после добавления комментария `ETag` списка комментариев меняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_comment_review_from_other_title(self, client, admin_client, admin):
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        assert client.get(url).status_code == 404, (
+            'Проверьте, что GET запрос комментариев к отзыву через чужое произведение '
+            'возвращает статус 404'
+        )
+        assert client.get(f'{url}{comments[0]["id"]}/').status_code == 404, (
+            'Проверьте, что GET запрос комментария через чужое произведение возвращает статус 404'
+        )
+        assert admin_client.post(url, data={'text': 'Не туда'}).status_code == 404, (
+            'Проверьте, что POST запрос комментария к отзыву через чужое произведение '
+            'возвращает статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_comments_list_query_count(self, client, admin_client, admin, django_assert_max_num_queries):
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        admin_client.post(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/comments/', data={'text': 'Один'}
+        )
+        for review, expected in ((reviews[1], 1), (reviews[0], len(comments))):
+            with django_assert_max_num_queries(3):
+                response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/comments/')
+            results = response.json()['results']
+            assert len(results) == expected and all(comment['author'] for comment in results), (
+                'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/{review_id}/comments/` '
+                'авторы комментариев загружаются одним запросом вместе с комментариями'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_comments_list_uses_index_order(self, client, admin_client, admin):
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        for query in ('', '?pagination=cursor'):
+            plans = sorted_query_plans(client, url + query)
+            assert plans and all(
+                'comment_review_pub_date_idx' in plan and 'TEMP B-TREE' not in plan for plan in plans
+            ), (
+                f'Проверьте, что GET запрос `{url + query}` читает комментарии по индексу '
+                f'(review_id, pub_date DESC) без сортировки: {plans}'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_09_comments_conditional_get_with_local_cache(self, client, admin_client, admin, settings,
+                                                          monkeypatch):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        urls = (url, f'{url}{comments[0]["id"]}/')
+        etags = {url: client.get(url).get('ETag') for url in urls}
+        # Запись в другом процессе не меняет локальную версию: ETag должен зависеть от базы.
+        monkeypatch.setattr('api.signals.touch', lambda *namespaces: None)
+        admin_client.patch(urls[1], data={'text': 'Исправленный комментарий'})
+        for url in urls:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            assert response.status_code == 200 and 'Исправленный комментарий' in response.content.decode(), (
+                'Проверьте, что `ETag` комментариев меняется после изменения комментария, '
+                'даже если версия кэша не изменилась'
+            )
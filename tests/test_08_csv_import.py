@@ -0,0 +1,71 @@
+import os
+
+import pytest
+from django.core.management import call_command
+
+
+class Test08CsvImport:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_load_csv(self):
+        from reviews.models import Comment, Review
+        from titles.models import Title
+
+        call_command('load_csv', verbosity=0)
+        assert Title.objects.count() == 32, (
+            'Проверьте, что команда `load_csv` загружает произведения из `static/data/titles.csv`'
+        )
+        assert Review.objects.count() == 72 and Comment.objects.count() == 3, (
+            'Проверьте, что команда `load_csv` загружает отзывы и комментарии'
+        )
+        assert Title.objects.get(pk=1).genre.count() == 1, (
+            'Проверьте, что команда `load_csv` загружает связи произведений и жанров'
+        )
+        assert str(Review.objects.get(pk=1).pub_date.date()) == '2019-09-24', (
+            'Проверьте, что команда `load_csv` сохраняет `pub_date` из файла'
+        )
+        assert Title.objects.get(pk=1).rating == 10, (
+            'Проверьте, что после загрузки отзывов пересчитывается `rating` произведений'
+        )
+
+        call_command('load_csv', 'review', 'comments', truncate=True, verbosity=0)
+        assert Review.objects.count() == 72 and Comment.objects.count() == 3, (
+            'Проверьте, что команда `load_csv --truncate` перезагружает данные таблиц'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_load_csv_parallel_resume(self, tmp_path):
+        from django.conf import settings
+
+        from api.csv_import import TABLES_BY_NAME, Checkpoint, parse_chunk, split_chunks
+        from reviews.models import Comment, Review
+
+        checkpoint_path = str(tmp_path / 'checkpoint.json')
+        options = {'parallel': True, 'workers': 2, 'chunk_size': 4096,
+                   'checkpoint': checkpoint_path, 'verbosity': 0}
+        call_command('load_csv', **options)
+        assert Review.objects.count() == 72 and Comment.objects.count() == 3, (
+            'Проверьте, что `load_csv --parallel` загружает все строки файлов'
+        )
+
+        table = TABLES_BY_NAME['review']
+        path = f'{settings.CSV_FILES_DIR}/{table.filename}'
+        header, chunks = split_chunks(path, 4096)
+        assert len(chunks) > 2, 'Файл отзывов должен делиться на несколько фрагментов'
+        first_ids = [row['id'] for row in parse_chunk('review', path, header, *chunks[0])]
+        Review.objects.exclude(id__in=first_ids).delete()
+        Checkpoint(checkpoint_path, 4096).mark(table, path, 1)
+
+        call_command('load_csv', 'review', **options)
+        assert Review.objects.count() == 72, (
+            'Проверьте, что `load_csv --parallel` продолжает загрузку с контрольной точки'
+        )
+
+        Review.objects.all().delete()
+        Checkpoint(checkpoint_path, 4096).mark(table, path, 1)
+        call_command('load_csv', 'review', 'comments', truncate=True, **options)
+        assert Review.objects.count() == 72 and Comment.objects.count() == 3, (
+            'Проверьте, что `load_csv --parallel --truncate` загружает таблицы с начала, '
+            'а не с оставшейся контрольной точки'
+        )
+        assert not os.path.exists(checkpoint_path)
@@ -0,0 +1,67 @@
+import pytest
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+
+class Test09ReplicaRouting:
+
+    def route(self, method, user=None, status=200):
+        from api_yamdb.db import ReplicaRoutingMiddleware
+        from titles.models import Title
+
+        routes = []
+
+        def view(request):
+            routes.append(router.db_for_read(Title))
+            if user is not None:
+                request.user = user
+                routes.append(router.db_for_read(Title))
+            return HttpResponse(status=status)
+
+        request = getattr(RequestFactory(), method)('/api/v1/titles/')
+        ReplicaRoutingMiddleware(view)(request)
+        return routes
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reads_go_to_replicas(self, settings, user):
+        from titles.models import Title
+
+        settings.DATABASE_REPLICAS = ['replica']
+        assert self.route('get') == ['replica'], (
+            'Проверьте, что чтения GET-запросов идут на реплику'
+        )
+        assert self.route('post') == ['default'], (
+            'Проверьте, что чтения небезопасных запросов идут в основную базу'
+        )
+        assert router.db_for_read(Title) == 'default' and router.db_for_write(Title) == 'default', (
+            'Проверьте, что вне HTTP-запроса чтение и запись идут в основную базу'
+        )
+        assert self.route('get', user) == ['replica', 'replica']
+        self.route('post', user, status=400)
+        assert self.route('get', user) == ['replica', 'replica'], (
+            'Проверьте, что неуспешный запрос не закрепляет пользователя за основной базой'
+        )
+        self.route('patch', user)
+        assert self.route('get', user) == ['replica', 'default'], (
+            'Проверьте, что после записи чтения пользователя идут в основную базу'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_no_replicas(self, settings):
+        settings.DATABASE_REPLICAS = []
+        assert self.route('get') == ['default'], (
+            'Проверьте, что без реплик все чтения идут в основную базу'
+        )
+
+    def test_03_replicas_require_shared_cache(self, settings):
+        from django.core.exceptions import ImproperlyConfigured
+
+        from api_yamdb.db import ReplicaRoutingMiddleware
+
+        settings.DATABASE_REPLICAS = ['replica']
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with pytest.raises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+        settings.DATABASE_REPLICAS = []
+        ReplicaRoutingMiddleware(lambda request: HttpResponse())
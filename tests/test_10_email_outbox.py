@@ -0,0 +1,132 @@
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class UnreachableBackend(BaseEmailBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('Сервер недоступен')
+
+    def send_messages(self, email_messages):
+        return len(email_messages)
+
+
+class Test10EmailOutbox:
+
+    @pytest.fixture(autouse=True)
+    def lazy_outbox(self, settings, monkeypatch):
+        from users import outbox
+
+        settings.EMAIL_OUTBOX_EAGER = False
+        self.wakes = []
+        monkeypatch.setattr(outbox.worker, 'wake', lambda: self.wakes.append(True))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_enqueues_email(self, client):
+        from users.models import OutgoingEmail
+
+        data = {'email': 'queued@yamdb.fake', 'username': 'queued'}
+        response = client.post('/api/v1/auth/signup/', data=data)
+        assert response.status_code == 200 and len(mail.outbox) == 0, (
+            'Проверьте, что регистрация не ждёт отправки письма'
+        )
+        assert OutgoingEmail.objects.filter(to=data['email'], sent_at__isnull=True).exists() and self.wakes, (
+            'Проверьте, что письмо с кодом подтверждения ставится в очередь и будит обработчик'
+        )
+        call_command('send_outbox', verbosity=0)
+        assert len(mail.outbox) == 1 and mail.outbox[0].to == [data['email']], (
+            'Проверьте, что команда `send_outbox` отправляет письма из очереди'
+        )
+        assert not OutgoingEmail.objects.filter(sent_at__isnull=True).exists(), (
+            'Проверьте, что отправленное письмо отмечается в очереди'
+        )
+        assert OutgoingEmail.objects.get().body == '', (
+            'Проверьте, что после отправки код подтверждения не хранится в очереди'
+        )
+        from users.admin import OutgoingEmailAdmin
+        assert 'body' in OutgoingEmailAdmin.exclude, (
+            'Проверьте, что текст письма с кодом подтверждения не показывается в админке'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_failed_email_is_retried(self, settings):
+        from django.utils import timezone
+
+        from users.models import OutgoingEmail
+        from users.outbox import enqueue_email, send_pending
+
+        enqueue_email('Тема', 'Текст', 'retry@yamdb.fake')
+        settings.EMAIL_BACKEND = 'tests.test_10_email_outbox.FailingBackend'
+        assert send_pending() == 1
+        email = OutgoingEmail.objects.get()
+        assert email.sent_at is None and email.attempts == 1 and 'SMTP' in email.last_error, (
+            'Проверьте, что неудачная отправка записывает попытку и ошибку'
+        )
+        assert email.next_attempt_at > timezone.now() and send_pending() == 0, (
+            'Проверьте, что повтор откладывается'
+        )
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        assert send_pending() == 1 and len(mail.outbox) == 1, (
+            'Проверьте, что отложенное письмо отправляется при следующей попытке'
+        )
+        assert OutgoingEmail.objects.get().attempts == 2
+
+        enqueue_email('Тема', 'Код 123', 'last@yamdb.fake')
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 1
+        settings.EMAIL_BACKEND = 'tests.test_10_email_outbox.FailingBackend'
+        send_pending()
+        email = OutgoingEmail.objects.get(to='last@yamdb.fake')
+        assert email.sent_at is None and email.body == '', (
+            'Проверьте, что после последней неудачной попытки текст письма стирается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_unreachable_server_backs_off(self, settings, monkeypatch):
+        from django.utils import timezone
+
+        from users.management.commands import send_outbox
+        from users.models import OutgoingEmail
+        from users.outbox import enqueue_email
+
+        enqueue_email('Тема', 'Текст', 'first@yamdb.fake')
+        enqueue_email('Тема', 'Текст', 'second@yamdb.fake')
+        settings.EMAIL_BACKEND = 'tests.test_10_email_outbox.UnreachableBackend'
+        call_command('send_outbox', verbosity=0)
+        emails = OutgoingEmail.objects.all()
+        assert len(emails) == 2 and all(
+            email.attempts == 1 and 'недоступен' in email.last_error and email.next_attempt_at > timezone.now()
+            for email in emails
+        ), (
+            'Проверьте, что при недоступном сервере попытка и ошибка записываются всем забранным письмам '
+            'и повтор откладывается'
+        )
+
+        class Stop(Exception):
+            pass
+
+        def failing_send_pending():
+            raise RuntimeError('сбой базы')
+
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                raise Stop
+
+        monkeypatch.setattr(send_outbox, 'send_pending', failing_send_pending)
+        monkeypatch.setattr(send_outbox.time, 'sleep', sleep)
+        with pytest.raises(Stop):
+            call_command('send_outbox', loop=True, verbosity=0)
+        assert len(sleeps) == 2, (
+            'Проверьте, что `send_outbox --loop` продолжает работу после ошибки прохода'
+        )
@@ -0,0 +1,58 @@
+import pytest
+
+
+@pytest.fixture
+def throttle_rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {scope.replace('_', '.'): rate for scope, rate in rates.items()},
+        }
+    return set_rates
+
+
+class Test11Throttling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_ip_budget(self, client, throttle_rates):
+        throttle_rates(auth_ip='2/min')
+        for number in range(2):
+            response = client.post('/api/v1/auth/signup/', data={
+                'email': f'flood{number}@yamdb.fake', 'username': f'flood{number}'
+            })
+            assert response.status_code == 200
+        response = client.post('/api/v1/auth/signup/', data={
+            'email': 'flood@yamdb.fake', 'username': 'flood'
+        })
+        assert response.status_code == 429 and int(response['Retry-After']) > 0, (
+            'Проверьте, что регистрация с одного адреса ограничена бюджетом `auth.ip` '
+            'и в ответе есть заголовок Retry-After'
+        )
+        assert client.get('/api/v1/titles/').status_code == 200, (
+            'Проверьте, что бюджет `auth` не ограничивает чтение каталога'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_review_user_token_bucket(self, user_client, throttle_rates, monkeypatch):
+        from api import throttling
+        from titles.models import Title
+
+        throttle_rates(writes_user='2/min')
+        titles = [Title.objects.create(name=f'Книга {number}', year=2000) for number in range(6)]
+        now = [1_000_000.0]
+        monkeypatch.setattr(throttling.time, 'time', lambda: now[0])
+
+        def post_review(title):
+            return user_client.post(f'/api/v1/titles/{title.id}/reviews/', data={'text': 'Текст', 'score': 5})
+
+        assert [post_review(title).status_code for title in titles[:3]] == [201, 201, 429], (
+            'Проверьте, что отзывы пользователя ограничены ёмкостью корзины `writes.user`'
+        )
+        now[0] += 30
+        assert [post_review(title).status_code for title in titles[2:4]] == [201, 429], (
+            'Проверьте, что корзина пополняется со скоростью `writes.user`'
+        )
+        now[0] += 3600
+        assert [post_review(title).status_code for title in titles[3:6]] == [201, 201, 429], (
+            'Проверьте, что после простоя в корзине не больше жетонов, чем её ёмкость'
+        )